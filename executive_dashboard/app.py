@@ -1,10 +1,22 @@
 import pandas as pd
+import plotly.io as pio
 import streamlit as st
 from data_loader import RetailDataLoader
 from metrics_calculator import MetricsCalculator
 from query_agent import QueryAgent
 from visualizations import DashboardVisualizations
 
+try:
+    import orjson  # noqa: F401
+
+    # Serialize figures with orjson instead of the stdlib json encoder
+    pio.json.config.default_engine = "orjson"
+except ImportError:
+    pass
+
+# Dashboard charts are read-only views; the mode bar only adds DOM per chart
+PLOTLY_CONFIG = {"displayModeBar": False, "responsive": True}
+
 st.set_page_config(
     page_title="Executive Dashboard",
     page_icon="📊",
@@ -16,6 +28,8 @@ st.set_page_config(
 @st.cache_resource
 def load_data():
     loader = RetailDataLoader()
+    # Every st.tabs body runs on each script run, so all workbooks are needed
+    # for the first render; read them up front, in parallel
     loader.load_all_data()
     return loader
 
@@ -28,308 +42,329 @@ def initialize_components(_loader):
     return metrics_calc, viz, query_agent
 
 
-def main():
-    st.title("🎯 Executive Dashboard - Retail Chain Analytics")
-    st.markdown("---")
+# Metric results are memoized across reruns; data_version busts the cache when
+# a workbook changes, and the leading underscore keeps the calculator unhashed.
+@st.cache_data(ttl=3600)
+def cached_key_metrics(_metrics_calc, data_version):
+    return _metrics_calc.get_all_key_metrics()
 
-    try:
-        data_loader = load_data()
-        metrics_calc, viz, query_agent = initialize_components(data_loader)
-    except Exception as e:
-        st.error(f"Error loading data: {e}")
-        return
 
-    tab1, tab2, tab3, tab4 = st.tabs(
-        [
-            "📈 Overview",
-            "🏪 Store Performance",
-            "🗺️ Regional Analysis",
-            "💬 Ask Questions",
-        ]
-    )
+@st.cache_data(ttl=3600)
+def cached_anomalies(_metrics_calc, data_version):
+    return _metrics_calc.detect_anomalies()
 
-    with tab1:
-        st.header("Key Performance Indicators")
 
-        all_metrics = metrics_calc.get_all_key_metrics()
+@st.cache_data(ttl=3600)
+def cached_store_performance(_metrics_calc, data_version):
+    return _metrics_calc.get_store_performance()
 
-        col1, col2, col3, col4 = st.columns(4)
 
-        with col1:
-            revenue = all_metrics.get("revenue", {})
-            total_rev = revenue.get("total_revenue", 0)
-            st.metric(
-                label="Total Revenue",
-                value=f"${total_rev:,.2f}",
-                delta=f"{revenue.get('transaction_count', 0)} transactions",
-            )
+@st.cache_data(ttl=3600)
+def cached_regional_performance(_metrics_calc, data_version):
+    return _metrics_calc.get_regional_performance()
 
-        with col2:
-            profit = all_metrics.get("profit", {})
-            margin = profit.get("overall_margin", 0)
-            st.metric(
-                label="Profit Margin",
-                value=f"{margin:.2f}%",
-                delta=f"${profit.get('gross_profit', 0):,.2f} profit",
-            )
 
-        with col3:
-            inventory = all_metrics.get("inventory", {})
-            total_inv = inventory.get("total_inventory", 0)
-            st.metric(
-                label="Total Inventory",
-                value=f"{total_inv:,.0f} units",
-                delta=f"{inventory.get('low_stock_items', 0)} low stock",
-            )
+@st.cache_data(ttl=3600)
+def cached_transactions_preview(_data_loader, data_version, rows=100):
+    transactions = _data_loader.store_transactions
+    # Hide Location column as it contains inconsistent data
+    display_cols = [col for col in transactions.columns if col != "Location"]
+    # Slice rows before projecting columns so only `rows` rows are copied
+    return transactions.head(rows).loc[:, display_cols]
 
-        with col4:
-            customer = all_metrics.get("customer_satisfaction", {})
-            satisfaction = customer.get("avg_satisfaction", 0)
-            st.metric(
-                label="Customer Satisfaction",
-                value=f"{satisfaction:.2f}/5.0",
-                delta=f"${customer.get('customer_lifetime_value', 0):,.2f} CLV",
-            )
 
-        st.markdown("---")
+# Each tab renders as a fragment, so a widget interaction inside one tab
+# (e.g. the chat buttons) reruns only that tab instead of the whole app.
+@st.fragment
+def render_overview(metrics_calc, viz, data_version):
+    st.header("Key Performance Indicators")
 
-        col1, col2 = st.columns(2)
+    all_metrics = cached_key_metrics(metrics_calc, data_version)
 
-        with col1:
-            st.subheader("Revenue Trend")
-            revenue_chart = viz.create_revenue_trend_chart()
-            if revenue_chart:
-                st.plotly_chart(revenue_chart, use_container_width=True)
-            else:
-                st.info("Revenue trend data not available")
+    col1, col2, col3, col4 = st.columns(4)
 
-        with col2:
-            st.subheader("Customer Purchase Distribution")
-            customer_chart = viz.create_customer_metrics_chart()
-            if customer_chart:
-                st.plotly_chart(customer_chart, use_container_width=True)
-            else:
-                st.info("Customer data not available")
+    with col1:
+        revenue = all_metrics.get("revenue", {})
+        total_rev = revenue.get("total_revenue", 0)
+        st.metric(
+            label="Total Revenue",
+            value=f"${total_rev:,.2f}",
+            delta=f"{revenue.get('transaction_count', 0)} transactions",
+        )
 
-        st.markdown("---")
-        st.subheader("🚨 Alerts & Anomalies")
+    with col2:
+        profit = all_metrics.get("profit", {})
+        margin = profit.get("overall_margin", 0)
+        st.metric(
+            label="Profit Margin",
+            value=f"{margin:.2f}%",
+            delta=f"${profit.get('gross_profit', 0):,.2f} profit",
+        )
+
+    with col3:
+        inventory = all_metrics.get("inventory", {})
+        total_inv = inventory.get("total_inventory", 0)
+        st.metric(
+            label="Total Inventory",
+            value=f"{total_inv:,.0f} units",
+            delta=f"{inventory.get('low_stock_items', 0)} low stock",
+        )
 
-        anomalies = metrics_calc.detect_anomalies()
+    with col4:
+        customer = all_metrics.get("customer_satisfaction", {})
+        satisfaction = customer.get("avg_satisfaction", 0)
+        st.metric(
+            label="Customer Satisfaction",
+            value=f"{satisfaction:.2f}/5.0",
+            delta=f"${customer.get('customer_lifetime_value', 0):,.2f} CLV",
+        )
+
+    st.markdown("---")
 
-        if anomalies:
-            for anomaly in anomalies:
-                severity = anomaly.get("severity", "medium")
-                icon = "🔴" if severity == "high" else "🟡"
-                st.warning(f"{icon} {anomaly['message']}")
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.subheader("Revenue Trend")
+        revenue_chart = viz.create_revenue_trend_chart()
+        if revenue_chart:
+            st.plotly_chart(
+                revenue_chart, use_container_width=True, config=PLOTLY_CONFIG
+            )
         else:
-            st.success(
-                "✅ No anomalies detected. All metrics are within normal ranges."
+            st.info("Revenue trend data not available")
+
+    with col2:
+        st.subheader("Customer Purchase Distribution")
+        customer_chart = viz.create_customer_metrics_chart()
+        if customer_chart:
+            st.plotly_chart(
+                customer_chart, use_container_width=True, config=PLOTLY_CONFIG
             )
+        else:
+            st.info("Customer data not available")
 
-    with tab2:
-        st.header("Store Performance Analysis")
+    st.markdown("---")
+    st.subheader("🚨 Alerts & Anomalies")
+
+    anomalies = cached_anomalies(metrics_calc, data_version)
+
+    if anomalies:
+        for anomaly in anomalies:
+            severity = anomaly.get("severity", "medium")
+            icon = "🔴" if severity == "high" else "🟡"
+            st.warning(f"{icon} {anomaly['message']}")
+    else:
+        st.success(
+            "✅ No anomalies detected. All metrics are within normal ranges."
+        )
 
-        col1, col2 = st.columns([2, 1])
 
-        with col1:
-            st.subheader("Top Stores by Revenue")
-            store_chart = viz.create_store_performance_chart()
-            if store_chart:
-                st.plotly_chart(store_chart, use_container_width=True)
-            else:
-                st.info("Store performance data not available")
+@st.fragment
+def render_store_performance(data_loader, metrics_calc, viz, data_version):
+    st.header("Store Performance Analysis")
 
-        with col2:
-            st.subheader("Store Metrics")
-            store_perf = metrics_calc.get_store_performance()
-            if not store_perf.empty:
-                st.dataframe(
-                    store_perf.head(10).style.format(
-                        {
-                            "Total_Revenue": "${:,.2f}",
-                            "Avg_Transaction": "${:,.2f}",
-                            "Transaction_Count": "{:,.0f}",
-                        }
-                    ),
-                    use_container_width=True,
-                )
-            else:
-                st.info("Store data not available")
+    col1, col2 = st.columns([2, 1])
 
-        st.markdown("---")
+    with col1:
+        st.subheader("Top Stores by Revenue")
+        store_chart = viz.create_store_performance_chart()
+        if store_chart:
+            st.plotly_chart(
+                store_chart, use_container_width=True, config=PLOTLY_CONFIG
+            )
+        else:
+            st.info("Store performance data not available")
 
-        st.subheader("Detailed Store Data")
-        if data_loader.store_transactions is not None:
-            # Hide Location column as it contains inconsistent data
-            display_cols = [
-                col
-                for col in data_loader.store_transactions.columns
-                if col != "Location"
-            ]
+    with col2:
+        st.subheader("Store Metrics")
+        store_perf = cached_store_performance(metrics_calc, data_version)
+        if not store_perf.empty:
             st.dataframe(
-                data_loader.store_transactions[display_cols].head(100),
+                store_perf.head(10),
+                column_config={
+                    "Total_Revenue": st.column_config.NumberColumn(
+                        format="$%,.2f"
+                    ),
+                    "Avg_Transaction": st.column_config.NumberColumn(
+                        format="$%,.2f"
+                    ),
+                    "Transaction_Count": st.column_config.NumberColumn(
+                        format="%,d"
+                    ),
+                },
                 use_container_width=True,
             )
-            st.caption(
-                "Note: Location column hidden due to data quality issues. Use StoreID for store identification."
-            )
+        else:
+            st.info("Store data not available")
 
-    with tab3:
-        st.header("Regional Analysis")
+    st.markdown("---")
 
-        col1, col2 = st.columns(2)
+    st.subheader("Detailed Store Data")
+    if data_loader.store_transactions is not None:
+        st.dataframe(
+            cached_transactions_preview(data_loader, data_version),
+            use_container_width=True,
+        )
+        st.caption(
+            "Note: Location column hidden due to data quality issues. Use StoreID for store identification."
+        )
 
-        with col1:
-            st.subheader("Regional Performance Heatmap")
-            heatmap = viz.create_regional_heatmap()
-            if heatmap:
-                st.plotly_chart(heatmap, use_container_width=True)
-            else:
-                st.info("Regional data not available")
 
-        with col2:
-            st.subheader("Profit Margins by Region")
-            margin_chart = viz.create_profit_margin_chart()
-            if margin_chart:
-                st.plotly_chart(margin_chart, use_container_width=True)
-            else:
-                st.info("Regional margin data not available")
+@st.fragment
+def render_regional_analysis(metrics_calc, viz, data_version):
+    st.header("Regional Analysis")
 
-        st.markdown("---")
+    col1, col2 = st.columns(2)
 
-        st.subheader("Regional Performance Table")
-        regional_perf = metrics_calc.get_regional_performance()
-        if not regional_perf.empty:
-            st.dataframe(
-                regional_perf.style.format(
-                    {
-                        "TotalPrice": "${:,.2f}",
-                        "TotalCost": "${:,.2f}",
-                        "Profit": "${:,.2f}",
-                        "Margin_%": "{:.2f}%",
-                    }
-                ),
-                use_container_width=True,
+    with col1:
+        st.subheader("Regional Performance Heatmap")
+        heatmap = viz.create_regional_heatmap()
+        if heatmap:
+            st.plotly_chart(
+                heatmap, use_container_width=True, config=PLOTLY_CONFIG
             )
+        else:
+            st.info("Regional data not available")
+
+    with col2:
+        st.subheader("Profit Margins by Region")
+        margin_chart = viz.create_profit_margin_chart()
+        if margin_chart:
+            st.plotly_chart(
+                margin_chart, use_container_width=True, config=PLOTLY_CONFIG
+            )
+        else:
+            st.info("Regional margin data not available")
 
-        col1, col2 = st.columns(2)
-
-        with col1:
-            st.subheader("Inventory Status")
-            inventory_chart = viz.create_inventory_status_chart()
-            if inventory_chart:
-                st.plotly_chart(inventory_chart, use_container_width=True)
-            else:
-                st.info("Inventory data not available")
+    st.markdown("---")
 
-    with tab4:
-        st.header("Ask Questions About Your Data")
+    st.subheader("Regional Performance Table")
+    regional_perf = cached_regional_performance(metrics_calc, data_version)
+    if not regional_perf.empty:
+        # column_config formats client-side; a pandas Styler would render
+        # an HTML cell per value on every rerun
+        st.dataframe(
+            regional_perf,
+            column_config={
+                "TotalPrice": st.column_config.NumberColumn(format="$%,.2f"),
+                "TotalCost": st.column_config.NumberColumn(format="$%,.2f"),
+                "Profit": st.column_config.NumberColumn(format="$%,.2f"),
+                "Margin_%": st.column_config.NumberColumn(format="%.2f%%"),
+            },
+            use_container_width=True,
+        )
 
-        col1, col2 = st.columns([3, 1])
+    col1, col2 = st.columns(2)
 
-        with col1:
-            if query_agent.llm_available:
-                provider = (
-                    query_agent.get_conversation_summary().get("provider", "Unknown")
-                    if query_agent.get_conversation_summary()
-                    else "LLM"
-                )
-                st.success(
-                    f"🤖 LLM Powered - Using {provider} with conversation memory"
-                )
-            else:
-                st.warning("⚠️ LLM Not Available - Using fallback query methods")
+    with col1:
+        st.subheader("Inventory Status")
+        inventory_chart = viz.create_inventory_status_chart()
+        if inventory_chart:
+            st.plotly_chart(
+                inventory_chart, use_container_width=True, config=PLOTLY_CONFIG
+            )
+        else:
+            st.info("Inventory data not available")
 
-        with col2:
-            if query_agent.llm_available:
-                conv_summary = query_agent.get_conversation_summary()
-                if conv_summary and conv_summary["message_count"] > 0:
-                    st.info(
-                        f"💬 {conv_summary['message_count']//2} exchanges in session"
-                    )
 
-        st.markdown(
-            "Ask natural language questions about your retail data. **Follow-up questions are supported!**"
-        )
-        st.markdown("- **Performance:** Show Q3 sales by region")
-        st.markdown("- **Comparison:** Compare this quarter vs last quarter")
-        st.markdown("- **Anomaly:** Which stores are underperforming?")
-        st.markdown("- **Drill-down:** What's driving high costs in Region X?")
-        st.markdown("- **Follow-ups:** Why? / Tell me more / What should we do?")
+@st.fragment
+def render_questions(query_agent):
+    st.header("Ask Questions About Your Data")
 
-        st.markdown("---")
+    col1, col2 = st.columns([3, 1])
 
-        # Always use code generation mode (only LLM-based approach)
-        use_code_gen = True
+    with col1:
+        if query_agent.llm_available:
+            provider = (
+                query_agent.get_conversation_summary().get("provider", "Unknown")
+                if query_agent.get_conversation_summary()
+                else "LLM"
+            )
+            st.success(
+                f"🤖 LLM Powered - Using {provider} with conversation memory"
+            )
+        else:
+            st.warning("⚠️ LLM Not Available - Using fallback query methods")
 
-        # Conversation controls
+    with col2:
         if query_agent.llm_available:
-            col1, col2, col3 = st.columns([4, 1, 1])
-
-            with col2:
-                if st.button("🔄 Clear History", help="Start a fresh conversation"):
-                    query_agent.clear_conversation()
-                    st.success("Conversation cleared!")
-                    st.rerun()
-
-            with col3:
-                if st.button("↩️ Undo Last", help="Remove last question/answer"):
-                    if query_agent.undo_last_query():
-                        st.success("Last exchange removed!")
-                        st.rerun()
-                    else:
-                        st.warning("No history to undo")
+            conv_summary = query_agent.get_conversation_summary()
+            if conv_summary and conv_summary["message_count"] > 0:
+                st.info(
+                    f"💬 {conv_summary['message_count']//2} exchanges in session"
+                )
 
-        question = st.text_input(
-            "Enter your question:",
-            placeholder="e.g., Which stores are underperforming in Q3 2025?",
-            key="question_input",
-        )
+    st.markdown(
+        "Ask natural language questions about your retail data. **Follow-up questions are supported!**"
+    )
+    st.markdown("- **Performance:** Show Q3 sales by region")
+    st.markdown("- **Comparison:** Compare this quarter vs last quarter")
+    st.markdown("- **Anomaly:** Which stores are underperforming?")
+    st.markdown("- **Drill-down:** What's driving high costs in Region X?")
+    st.markdown("- **Follow-ups:** Why? / Tell me more / What should we do?")
+
+    st.markdown("---")
+
+    # Always use code generation mode (only LLM-based approach)
+    use_code_gen = True
+
+    # Conversation controls
+    if query_agent.llm_available:
+        col1, col2, col3 = st.columns([4, 1, 1])
 
-        col1, col2 = st.columns([4, 1])
-        with col1:
-            ask_button = st.button(
-                "Get Answer", type="primary", use_container_width=True
-            )
         with col2:
-            if query_agent.llm_available:
-                conv_summary = query_agent.get_conversation_summary()
-                if conv_summary:
-                    with st.expander("📊 Session Info"):
-                        st.write(f"**Exchanges:** {conv_summary['message_count']//2}")
-                        st.write(f"**Duration:** {conv_summary['session_duration']}")
-                        st.write(f"**Model:** {conv_summary['model']}")
-
-        if ask_button:
-            if question:
-                with st.spinner(
-                    "Analyzing data..."
-                    if not use_code_gen
-                    else "Generating and executing code..."
-                ):
-                    answer, viz = query_agent.query(question, use_code_gen=use_code_gen)
-
-                    # Handle both dictionary and string responses
-                    if isinstance(answer, dict):
-                        analysis = answer.get("analysis", "")
-                        code = answer.get("code", "")
-                        result_type = answer.get("result_type", "Unknown")
-
-                        # Display answer in left column, viz in right if available
-                        if viz is not None:
-                            col1, col2 = st.columns([1, 1])
-                            with col1:
-                                st.markdown("### Answer:")
-                                st.success(analysis)
-
-                                # Show code in expander
-                                with st.expander("🔍 View Generated Code"):
-                                    st.code(code, language="python")
-                                    st.caption(f"**Result Type:** {result_type}")
-                            with col2:
-                                st.markdown("### Visualization:")
-                                st.plotly_chart(viz, use_container_width=True)
-                        else:
+            if st.button("🔄 Clear History", help="Start a fresh conversation"):
+                query_agent.clear_conversation()
+                st.success("Conversation cleared!")
+                st.rerun(scope="fragment")
+
+        with col3:
+            if st.button("↩️ Undo Last", help="Remove last question/answer"):
+                if query_agent.undo_last_query():
+                    st.success("Last exchange removed!")
+                    st.rerun(scope="fragment")
+                else:
+                    st.warning("No history to undo")
+
+    question = st.text_input(
+        "Enter your question:",
+        placeholder="e.g., Which stores are underperforming in Q3 2025?",
+        key="question_input",
+    )
+
+    col1, col2 = st.columns([4, 1])
+    with col1:
+        ask_button = st.button(
+            "Get Answer", type="primary", use_container_width=True
+        )
+    with col2:
+        if query_agent.llm_available:
+            conv_summary = query_agent.get_conversation_summary()
+            if conv_summary:
+                with st.expander("📊 Session Info"):
+                    st.write(f"**Exchanges:** {conv_summary['message_count']//2}")
+                    st.write(f"**Duration:** {conv_summary['session_duration']}")
+                    st.write(f"**Model:** {conv_summary['model']}")
+
+    if ask_button:
+        if question:
+            with st.spinner(
+                "Analyzing data..."
+                if not use_code_gen
+                else "Generating and executing code..."
+            ):
+                answer, viz = query_agent.query(question, use_code_gen=use_code_gen)
+
+                # Handle both dictionary and string responses
+                if isinstance(answer, dict):
+                    analysis = answer.get("analysis", "")
+                    code = answer.get("code", "")
+                    result_type = answer.get("result_type", "Unknown")
+
+                    # Display answer in left column, viz in right if available
+                    if viz is not None:
+                        col1, col2 = st.columns([1, 1])
+                        with col1:
                             st.markdown("### Answer:")
                             st.success(analysis)
 
@@ -337,59 +372,108 @@ def main():
                             with st.expander("🔍 View Generated Code"):
                                 st.code(code, language="python")
                                 st.caption(f"**Result Type:** {result_type}")
+                        with col2:
+                            st.markdown("### Visualization:")
+                            st.plotly_chart(
+                                viz, use_container_width=True, config=PLOTLY_CONFIG
+                            )
                     else:
-                        # Handle string responses (fallback mode)
-                        if viz is not None:
-                            col1, col2 = st.columns([1, 1])
-                            with col1:
-                                st.markdown("### Answer:")
-                                st.success(answer)
-                            with col2:
-                                st.markdown("### Visualization:")
-                                st.plotly_chart(viz, use_container_width=True)
-                        else:
+                        st.markdown("### Answer:")
+                        st.success(analysis)
+
+                        # Show code in expander
+                        with st.expander("🔍 View Generated Code"):
+                            st.code(code, language="python")
+                            st.caption(f"**Result Type:** {result_type}")
+                else:
+                    # Handle string responses (fallback mode)
+                    if viz is not None:
+                        col1, col2 = st.columns([1, 1])
+                        with col1:
                             st.markdown("### Answer:")
                             st.success(answer)
+                        with col2:
+                            st.markdown("### Visualization:")
+                            st.plotly_chart(
+                                viz, use_container_width=True, config=PLOTLY_CONFIG
+                            )
+                    else:
+                        st.markdown("### Answer:")
+                        st.success(answer)
+
+                # Show conversation tip
+                if query_agent.llm_available:
+                    st.info(
+                        "💡 **Tip:** You can now ask follow-up questions like 'Why is that?' or 'What should we do about it?'"
+                    )
+        else:
+            st.warning("Please enter a question first.")
 
-                    # Show conversation tip
-                    if query_agent.llm_available:
-                        st.info(
-                            "💡 **Tip:** You can now ask follow-up questions like 'Why is that?' or 'What should we do about it?'"
-                        )
-            else:
-                st.warning("Please enter a question first.")
+    st.markdown("---")
 
-        st.markdown("---")
+    st.subheader("Quick Insights")
 
-        st.subheader("Quick Insights")
+    col1, col2 = st.columns(2)
 
-        col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Show Underperforming Stores"):
+            with st.spinner("Analyzing..."):
+                result = query_agent._get_underperforming_stores()
+                st.info(result)
 
-        with col1:
-            if st.button("Show Underperforming Stores"):
-                with st.spinner("Analyzing..."):
-                    result = query_agent._get_underperforming_stores()
-                    st.info(result)
+    with col2:
+        if st.button("Show Top Performers"):
+            with st.spinner("Analyzing..."):
+                result = query_agent._get_top_stores()
+                st.info(result)
 
-        with col2:
-            if st.button("Show Top Performers"):
-                with st.spinner("Analyzing..."):
-                    result = query_agent._get_top_stores()
-                    st.info(result)
+    col3, col4 = st.columns(2)
 
-        col3, col4 = st.columns(2)
+    with col3:
+        if st.button("Analyze Regional Costs"):
+            with st.spinner("Analyzing..."):
+                result = query_agent._analyze_regional_costs()
+                st.info(result)
 
-        with col3:
-            if st.button("Analyze Regional Costs"):
-                with st.spinner("Analyzing..."):
-                    result = query_agent._analyze_regional_costs()
-                    st.info(result)
+    with col4:
+        if st.button("Show Profit Leaders"):
+            with st.spinner("Analyzing..."):
+                result = query_agent._get_top_stores_by_profit()
+                st.info(result)
+
+
+def main():
+    st.title("🎯 Executive Dashboard - Retail Chain Analytics")
+    st.markdown("---")
+
+    try:
+        data_loader = load_data()
+        metrics_calc, viz, query_agent = initialize_components(data_loader)
+        data_version = data_loader.data_version()
+    except Exception as e:
+        st.error(f"Error loading data: {e}")
+        return
 
-        with col4:
-            if st.button("Show Profit Leaders"):
-                with st.spinner("Analyzing..."):
-                    result = query_agent._get_top_stores_by_profit()
-                    st.info(result)
+    tab1, tab2, tab3, tab4 = st.tabs(
+        [
+            "📈 Overview",
+            "🏪 Store Performance",
+            "🗺️ Regional Analysis",
+            "💬 Ask Questions",
+        ]
+    )
+
+    with tab1:
+        render_overview(metrics_calc, viz, data_version)
+
+    with tab2:
+        render_store_performance(data_loader, metrics_calc, viz, data_version)
+
+    with tab3:
+        render_regional_analysis(metrics_calc, viz, data_version)
+
+    with tab4:
+        render_questions(query_agent)
 
     with st.sidebar:
         st.header("Dashboard Controls")
@@ -401,13 +485,17 @@ def main():
 
         for dataset_name, info in summary.items():
             with st.expander(f"📊 {dataset_name.title()}"):
-                st.write(f"**Rows:** {info['shape'][0]}")
-                st.write(f"**Columns:** {info['shape'][1]}")
-                st.write("**Fields:**")
-                for col in info["columns"][:5]:
-                    st.write(f"- {col}")
+                # One markdown element per dataset instead of one per line
+                lines = [
+                    f"**Rows:** {info['shape'][0]}  ",
+                    f"**Columns:** {info['shape'][1]}  ",
+                    "**Fields:**",
+                    "",
+                    *(f"- {col}" for col in info["columns"][:5]),
+                ]
                 if len(info["columns"]) > 5:
-                    st.write(f"... and {len(info['columns']) - 5} more")
+                    lines += ["", f"... and {len(info['columns']) - 5} more"]
+                st.markdown("\n".join(lines))
 
         st.markdown("---")
 
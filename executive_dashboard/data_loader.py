@@ -1,61 +1,344 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Tuple
 
 import numpy as np
 import pandas as pd
 
+try:
+    import polars as pl
+
+    POLARS_AVAILABLE = True
+except ImportError:
+    POLARS_AVAILABLE = False
+    pl = None
+
+try:
+    import python_calamine  # noqa: F401
+
+    # Rust-backed reader: much faster than openpyxl and no workbook DOM in memory
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
+
+# Loader attribute -> source workbook under data_dir
+DATASET_FILES = {
+    "customer_data": "Customer-Purchase-History.xlsx",
+    "inventory_data": "Inventory-Tracking.xlsx",
+    "online_orders": "Online-Store-Orders.xlsx",
+    "product_sales": "Product-Sales-Region.xlsx",
+    "store_transactions": "Retail-Store-Transactions.xlsx",
+}
+
+# Loader attribute -> key used in load_all_data() / get_data_summary() results
+DATASET_KEYS = {
+    "customer_data": "customers",
+    "inventory_data": "inventory",
+    "online_orders": "online_orders",
+    "product_sales": "product_sales",
+    "store_transactions": "store_transactions",
+}
+
+# Low-cardinality string columns stored as pandas Categorical after load
+CATEGORICAL_COLUMNS = {
+    "store_transactions": [
+        "StoreID",
+        "Region",
+        "Product",
+        "Location",
+        "PaymentType",
+        "DayOfWeek",
+        "TimeOfDay",
+    ],
+    "product_sales": ["Region", "Product", "PaymentMethod", "CustomerType"],
+    "inventory_data": ["ProductName", "Supplier"],
+    "customer_data": ["Product", "ProductCategory", "PaymentMethod"],
+    "online_orders": ["Product", "PaymentMethod", "OrderStatus", "ReferralSource"],
+}
+
+# Columns whose values name things a question can single out (lowercased
+# into RetailDataLoader.entity_names)
+ENTITY_COLUMNS = ("StoreID", "Region", "Location", "Product", "ProductName")
+
+# Integer columns narrowed to int32 when their values fit
+INTEGER_COLUMNS = {
+    "store_transactions": ["Quantity"],
+    "product_sales": ["Quantity", "Returned"],
+    "inventory_data": ["QuantityInStock", "ReorderPoint", "LeadTime"],
+    "customer_data": ["Quantity", "ReviewRating"],
+    "online_orders": ["Quantity", "ItemsInCart"],
+}
+
+
+def _optimize_dtypes(df: pd.DataFrame, cat_cols=(), int_cols=()) -> pd.DataFrame:
+    """Convert repeated strings to categoricals and shrink integer columns in place"""
+    for col in cat_cols:
+        if col in df.columns and df[col].dtype != "category":
+            df[col] = df[col].astype("category")
+
+    int32 = np.iinfo(np.int32)
+    for col in int_cols:
+        if col in df.columns and pd.api.types.is_integer_dtype(df[col]):
+            # int32 rather than the smallest fit so arithmetic in generated
+            # code (e.g. Quantity * 100) cannot overflow a tiny int8/int16
+            if len(df) == 0 or (
+                df[col].min() >= int32.min and df[col].max() <= int32.max
+            ):
+                df[col] = df[col].astype("int32")
+
+    return df
+
+
+def _column_major(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame whose 2D blocks store each column contiguously
+
+    Frames wrapping a row-major 2D array (e.g. DataFrame(arr, copy=False))
+    have strided columns, which slows every column reduction. Workbook and
+    Parquet loads are already column-major and are returned unchanged.
+    """
+    for block in df._mgr.blocks:
+        values = block.values
+        if (
+            isinstance(values, np.ndarray)
+            and values.ndim == 2
+            and not values.flags["C_CONTIGUOUS"]
+        ):
+            # DataFrame.copy() lays each block out row-per-column
+            return df.copy()
+    return df
+
+
+def _dataset_property(attr: str) -> property:
+    def getter(self):
+        return self._frames[attr]
+
+    def setter(self, df):
+        if df is not None:
+            df = _column_major(df)
+        self._frames[attr] = df
+        self._polars_frames.pop(attr, None)
+        self._summaries.pop(attr, None)
+        self._column_bounds.pop(attr, None)
+
+    return property(getter, setter, doc=f"{DATASET_FILES[attr]} as a DataFrame")
+
 
 class RetailDataLoader:
-    def __init__(self, data_dir: str = "data/sales_data"):
+    customer_data = _dataset_property("customer_data")
+    inventory_data = _dataset_property("inventory_data")
+    online_orders = _dataset_property("online_orders")
+    product_sales = _dataset_property("product_sales")
+    store_transactions = _dataset_property("store_transactions")
+
+    def __init__(self, data_dir: str = "data/sales_data", use_polars: bool = False):
         self.data_dir = Path(data_dir)
-        self.customer_data = None
-        self.inventory_data = None
-        self.online_orders = None
-        self.product_sales = None
-        self.store_transactions = None
+        self._cache_dir = self.data_dir / ".cache"
+        # Polars mirrors of the pandas frames for groupby-heavy metrics
+        self.use_polars = use_polars and POLARS_AVAILABLE
+        self._polars_frames = {}
+        self._frames = dict.fromkeys(DATASET_FILES)
+        # Per-dataset {"shape", "columns"} entries backing get_data_summary()
+        self._summaries = {}
+        # Per-dataset {column: (min, max)} entries backing column_bounds()
+        self._column_bounds = {}
+        # (input frame identities, frame) backing the sales_with_cost property
+        self._sales_with_cost = (None, None)
+        # (input frame identity, {region: frame}) backing product_sales_by_region
+        self._sales_by_region = (None, None)
+        # (input frame identity, frame) backing store_transactions_by_date
+        self._transactions_by_date = (None, None)
+        # (loader fingerprint, names) backing entity_names
+        self._entity_names = (None, frozenset())
+
+    def _read_dataset(self, attr: str) -> pd.DataFrame:
+        return _optimize_dtypes(
+            self._load_one(DATASET_FILES[attr]),
+            cat_cols=CATEGORICAL_COLUMNS.get(attr, ()),
+            int_cols=INTEGER_COLUMNS.get(attr, ()),
+        )
+
+    def _fresh_cache_path(self, xlsx_name: str):
+        """Parquet copy of a workbook if it is at least as new as the workbook"""
+        xlsx_path = self.data_dir / xlsx_name
+        parquet_path = self._cache_dir / f"{xlsx_path.stem}.parquet"
+        if (
+            parquet_path.exists()
+            and parquet_path.stat().st_mtime >= xlsx_path.stat().st_mtime
+        ):
+            return parquet_path
+        return None
+
+    def _load_one(self, xlsx_name: str) -> pd.DataFrame:
+        """Read a workbook, going through a Parquet copy under .cache when fresh"""
+        xlsx_path = self.data_dir / xlsx_name
+        parquet_path = self._cache_dir / f"{xlsx_path.stem}.parquet"
+
+        try:
+            if self._fresh_cache_path(xlsx_name) is not None:
+                return pd.read_parquet(parquet_path, engine="pyarrow")
+        except (ImportError, OSError, ValueError):
+            # pyarrow missing or a corrupt cache file: fall back to the workbook
+            pass
+
+        df = pd.read_excel(xlsx_path, engine=EXCEL_ENGINE)
+
+        # The cache is only an optimisation: any failure to write it (e.g.
+        # pyarrow's ArrowTypeError on an object column mixing ints and
+        # strings) leaves the workbook data as read
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            df.to_parquet(parquet_path, engine="pyarrow", compression="snappy")
+        except Exception as e:
+            print(f"Parquet cache not written for {xlsx_name}: {e}")
+            # Don't leave a partial file that would look fresh next time
+            parquet_path.unlink(missing_ok=True)
+
+        return df
 
     def load_all_data(self) -> Dict[str, pd.DataFrame]:
-        self.customer_data = pd.read_excel(
-            self.data_dir / "Customer-Purchase-History.xlsx"
+        # Workbooks are independent, so read (or convert) them concurrently
+        with ThreadPoolExecutor(max_workers=len(DATASET_FILES)) as executor:
+            futures = {
+                attr: executor.submit(self._read_dataset, attr)
+                for attr in DATASET_FILES
+            }
+            for attr, future in futures.items():
+                setattr(self, attr, future.result())
+
+        self._polars_frames = {}
+        for attr in DATASET_FILES:
+            self._summaries[attr] = self._summarize_frame(self._frames[attr])
+
+        return {key: self._frames[attr] for attr, key in DATASET_KEYS.items()}
+
+    def data_version(self) -> str:
+        """Token that changes whenever one of the source workbooks is modified"""
+        return "|".join(
+            f"{filename}:{(self.data_dir / filename).stat().st_mtime_ns}"
+            for filename in DATASET_FILES.values()
+            if (self.data_dir / filename).exists()
         )
-        self.inventory_data = pd.read_excel(self.data_dir / "Inventory-Tracking.xlsx")
-        self.online_orders = pd.read_excel(self.data_dir / "Online-Store-Orders.xlsx")
-        self.product_sales = pd.read_excel(self.data_dir / "Product-Sales-Region.xlsx")
-        self.store_transactions = pd.read_excel(
-            self.data_dir / "Retail-Store-Transactions.xlsx"
+
+    def fingerprint(self) -> tuple:
+        """Identity and row count of each loaded frame; changes on any reload"""
+        return tuple(
+            None if df is None else (id(df), len(df)) for df in self._frames.values()
         )
 
-        return {
-            "customers": self.customer_data,
-            "inventory": self.inventory_data,
-            "online_orders": self.online_orders,
-            "product_sales": self.product_sales,
-            "store_transactions": self.store_transactions,
-        }
+    def to_polars(self, attr: str):
+        """Polars copy of a loaded dataset, converted on first use"""
+        if not self.use_polars:
+            return None
+
+        df = getattr(self, attr)
+        if df is None:
+            return None
+
+        if attr not in self._polars_frames:
+            self._polars_frames[attr] = pl.from_pandas(df)
+        return self._polars_frames[attr]
+
+    @property
+    def sales_with_cost(self):
+        """product_sales with each product's mean inventory UnitCost joined on
+
+        Built once per pair of loaded frames, so cost and profit queries skip
+        the per-query merge. Inventory lists each product many times, so the
+        mean cost keeps one row per sale.
+        """
+        product_sales = self.product_sales
+        inventory = self.inventory_data
+        if product_sales is None or inventory is None:
+            return None
+
+        key = (id(product_sales), len(product_sales), id(inventory), len(inventory))
+        if self._sales_with_cost[0] != key:
+            unit_costs = inventory.groupby("ProductName", observed=True, sort=False)[
+                "UnitCost"
+            ].mean()
+            # map() on a categorical can return a categorical, hence the cast
+            merged = product_sales.assign(
+                UnitCost=product_sales["Product"].map(unit_costs).astype(float)
+            )
+            self._sales_with_cost = (key, merged)
+        return self._sales_with_cost[1]
+
+    @property
+    def product_sales_by_region(self):
+        """product_sales split into one frame per Region, built once per load
+
+        Lets single-region queries pick their rows with a dict lookup instead
+        of masking the whole frame each time.
+        """
+        product_sales = self.product_sales
+        if product_sales is None:
+            return None
+
+        key = (id(product_sales), len(product_sales))
+        if self._sales_by_region[0] != key:
+            partitions = dict(
+                tuple(product_sales.groupby("Region", observed=True, sort=False))
+            )
+            self._sales_by_region = (key, partitions)
+        return self._sales_by_region[1]
+
+    @property
+    def store_transactions_by_date(self):
+        """store_transactions indexed by Date and sorted, built once per load
+
+        Date-range filters on it are index slices (a binary search) instead
+        of a boolean mask over every row.
+        """
+        transactions = self.store_transactions
+        if transactions is None or "Date" not in transactions.columns:
+            return None
+
+        key = (id(transactions), len(transactions))
+        if self._transactions_by_date[0] != key:
+            by_date = transactions.set_index("Date").sort_index(kind="stable")
+            self._transactions_by_date = (key, by_date)
+        return self._transactions_by_date[1]
+
+    @property
+    def entity_names(self) -> frozenset:
+        """Lowercased store, region, location and product names of loaded frames
+
+        Collected once per load; the response caches use them to tell apart
+        questions that differ only in the entity they ask about.
+        """
+        fingerprint = self.fingerprint()
+        if self._entity_names[0] != fingerprint:
+            names = set()
+            for df in self._frames.values():
+                if df is None:
+                    continue
+                for column in ENTITY_COLUMNS:
+                    if column in df.columns:
+                        names.update(
+                            " ".join(str(value).lower().split())
+                            for value in df[column].dropna().unique()
+                        )
+            self._entity_names = (fingerprint, frozenset(names))
+        return self._entity_names[1]
+
+    def column_bounds(self, attr: str, column: str) -> Tuple:
+        """(min, max) of a dataset column, scanned once per loaded frame"""
+        bounds = self._column_bounds.setdefault(attr, {})
+        if column not in bounds:
+            values = getattr(self, attr)[column]
+            bounds[column] = (values.min(), values.max())
+        return bounds[column]
+
+    @staticmethod
+    def _summarize_frame(df: pd.DataFrame) -> dict:
+        return {"shape": df.shape, "columns": list(df.columns)}
 
     def get_data_summary(self) -> Dict[str, dict]:
-        if self.customer_data is None:
+        if self._frames["customer_data"] is None:
             self.load_all_data()
 
-        return {
-            "customers": {
-                "shape": self.customer_data.shape,
-                "columns": list(self.customer_data.columns),
-            },
-            "inventory": {
-                "shape": self.inventory_data.shape,
-                "columns": list(self.inventory_data.columns),
-            },
-            "online_orders": {
-                "shape": self.online_orders.shape,
-                "columns": list(self.online_orders.columns),
-            },
-            "product_sales": {
-                "shape": self.product_sales.shape,
-                "columns": list(self.product_sales.columns),
-            },
-            "store_transactions": {
-                "shape": self.store_transactions.shape,
-                "columns": list(self.store_transactions.columns),
-            },
-        }
+        for attr in DATASET_FILES:
+            if attr not in self._summaries:
+                self._summaries[attr] = self._summarize_frame(self._frames[attr])
+
+        return {key: self._summaries[attr] for attr, key in DATASET_KEYS.items()}
@@ -1,10 +1,25 @@
 import os
+import threading
+import time
+from collections import OrderedDict, deque
 from datetime import datetime
-from typing import Dict, List, Optional
+from typing import Deque, Dict, Iterator, List, Optional
 
+import requests
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 from langchain_llama_stack import ChatLlamaStack
 
+from llm_handler import BACKEND_ERROR_PREFIX, LLM_UNREACHABLE_ERRORS
+
+# Max ChatLlamaStack instances kept for per-call temperature/max_tokens overrides
+CLIENT_CACHE_SIZE = 8
+
+# Seconds an is_available() result is reused before probing the server again
+AVAILABILITY_TTL = 60
+
+# Seconds to wait for a Responses API turn before giving up on the server
+RESPONSE_TIMEOUT = 120
+
 
 class LlamaStackLLM:
     """LlamaStack integration with conversation history for follow-ups
@@ -26,20 +41,101 @@ class LlamaStackLLM:
         self.temperature = temperature
 
         # ChatLlamaStack needs the OpenAI-compatible endpoint
-        openai_endpoint = f"{self.api_url}/v1/openai/v1/"
+        self.openai_endpoint = f"{self.api_url}/v1/openai/v1/"
 
         # Initialize ChatLlamaStack
         self.llm = ChatLlamaStack(
             model=self.model,
-            base_url=openai_endpoint,
+            base_url=self.openai_endpoint,
             temperature=self.temperature,
         )
 
+        # Clients for custom sampling params, keyed on (temperature, max_tokens)
+        self._client_cache: "OrderedDict[tuple, ChatLlamaStack]" = OrderedDict()
+        # query_many() workers and background analyses share the cache
+        self._client_lock = threading.Lock()
+
+        # Keep-alive session for plain REST calls to the LlamaStack server
+        self._session = requests.Session()
+        self._session.headers.update({"Content-Type": "application/json"})
+        self._session.mount(
+            "http://", requests.adapters.HTTPAdapter(pool_maxsize=4)
+        )
+        self._session.mount(
+            "https://", requests.adapters.HTTPAdapter(pool_maxsize=4)
+        )
+
+        # Cached is_available() outcome and when it was measured
+        self._avail_checked_at: Optional[float] = None
+        self._avail_result = False
+
         # Conversation history management
         self.max_history = max_history
-        self.conversation_history: List[Dict[str, str]] = []
+        # Bounded deque drops the oldest messages once max_history exchanges are kept
+        self.conversation_history: Deque[Dict[str, str]] = deque(
+            maxlen=max_history * 2
+        )
         self.session_start = datetime.now()
 
+        # Server-side conversation state via the Responses API: each turn sends
+        # only the new message and chains on the previous response id. Turned
+        # off for good if the server does not implement the endpoint.
+        self._server_session = True
+        self._response_ids: Deque[str] = deque(maxlen=max_history)
+
+    def _get_or_create(
+        self, temperature: Optional[float], max_tokens: Optional[int]
+    ) -> ChatLlamaStack:
+        """Reuse one ChatLlamaStack per sampling config across calls"""
+        key = (temperature, max_tokens)
+        with self._client_lock:
+            llm = self._client_cache.get(key)
+            if llm is not None:
+                self._client_cache.move_to_end(key)
+                return llm
+
+            kwargs = {"model": self.model, "base_url": self.openai_endpoint}
+            if temperature is not None:
+                kwargs["temperature"] = temperature
+            if max_tokens is not None:
+                kwargs["max_tokens"] = max_tokens
+            llm = ChatLlamaStack(**kwargs)
+            # Send through the base instance's HTTP client so every sampling
+            # config shares one keep-alive connection pool instead of opening
+            # (and handshaking) its own
+            shared_client = getattr(self.llm, "client", None)
+            if shared_client is not None:
+                try:
+                    llm.client = shared_client
+                except (AttributeError, TypeError, ValueError):
+                    pass
+
+            self._client_cache[key] = llm
+            if len(self._client_cache) > CLIENT_CACHE_SIZE:
+                self._client_cache.popitem(last=False)
+            return llm
+
+    @staticmethod
+    def _to_lc_messages(messages: List[Dict[str, str]]) -> list:
+        """Convert role/content dicts to LangChain message objects"""
+        lc_messages = []
+        for msg in messages:
+            if msg["role"] == "system":
+                lc_messages.append(SystemMessage(content=msg["content"]))
+            elif msg["role"] == "user":
+                lc_messages.append(HumanMessage(content=msg["content"]))
+            elif msg["role"] == "assistant":
+                lc_messages.append(AIMessage(content=msg["content"]))
+        return lc_messages
+
+    def _client_for(
+        self, temperature: Optional[float], max_tokens: Optional[int]
+    ) -> ChatLlamaStack:
+        # Use a cached LLM instance with custom parameters if needed
+        if temperature is not None or max_tokens is not None:
+            return self._get_or_create(temperature, max_tokens)
+        return self.llm
+
     def chat_completion(
         self,
         messages: List[Dict[str, str]],
@@ -47,47 +143,140 @@ class LlamaStackLLM:
         max_tokens: Optional[int] = None,
         stream: bool = False,
     ) -> str:
-        """Send chat completion request to LlamaStack using ChatLlamaStack"""
+        """Send chat completion request to LlamaStack using ChatLlamaStack
 
-        try:
-            # Convert messages format for LangChain
-            lc_messages = []
-            for msg in messages:
-                if msg["role"] == "system":
-                    lc_messages.append(SystemMessage(content=msg["content"]))
-                elif msg["role"] == "user":
-                    lc_messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    lc_messages.append(AIMessage(content=msg["content"]))
-
-            # Create a temporary LLM instance with custom parameters if needed
-            if temperature is not None or max_tokens is not None:
-                openai_endpoint = f"{self.api_url}/v1/openai/v1/"
-                kwargs = {"model": self.model, "base_url": openai_endpoint}
-                if temperature is not None:
-                    kwargs["temperature"] = temperature
-                if max_tokens is not None:
-                    kwargs["max_tokens"] = max_tokens
-                temp_llm = ChatLlamaStack(**kwargs)
-                response = temp_llm.invoke(lc_messages)
-            else:
-                response = self.llm.invoke(lc_messages)
+        API errors come back as "Error calling LlamaStack API: ..." text, but
+        LLM_UNREACHABLE_ERRORS are raised so callers stop calling the server.
+        """
 
+        try:
+            response = self._client_for(temperature, max_tokens).invoke(
+                self._to_lc_messages(messages)
+            )
             return response.content
 
+        except LLM_UNREACHABLE_ERRORS:
+            raise
+        except Exception as e:
+            return f"{BACKEND_ERROR_PREFIX}: {str(e)}"
+
+    def stream_completion(
+        self,
+        messages: List[Dict[str, str]],
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+    ) -> Iterator[str]:
+        """Like chat_completion, but yield text deltas as the server decodes them
+
+        An error is yielded as a final "Error calling LlamaStack API" chunk;
+        connection and timeout errors are raised, as in chat_completion.
+        """
+        try:
+            llm = self._client_for(temperature, max_tokens)
+            for chunk in llm.stream(self._to_lc_messages(messages)):
+                if chunk.content:
+                    yield chunk.content
+        except LLM_UNREACHABLE_ERRORS:
+            raise
         except Exception as e:
-            return f"Error calling LlamaStack API: {str(e)}"
+            yield f"{BACKEND_ERROR_PREFIX}: {str(e)}"
+
+    def _respond(
+        self,
+        user_message: str,
+        system_message: Optional[str],
+        temperature: Optional[float],
+        max_tokens: Optional[int],
+    ) -> Optional[str]:
+        """Send one turn through the Responses API, chained on the last response
+
+        A chain holds at most max_history turns; the next turn starts a new
+        one from the (equally bounded) local history, so the server-side
+        context cannot grow without limit. Returns None when the server has
+        no Responses API, so the caller can fall back to resending the full
+        history.
+        """
+        payload = {
+            "model": self.model,
+            "input": user_message,
+            "store": True,
+            "temperature": self.temperature if temperature is None else temperature,
+        }
+        if self._response_ids and len(self._response_ids) < self.max_history:
+            payload["previous_response_id"] = self._response_ids[-1]
+        else:
+            self._response_ids.clear()
+            if system_message:
+                payload["instructions"] = system_message
+            if self.conversation_history:
+                payload["input"] = [
+                    *self.conversation_history,
+                    {"role": "user", "content": user_message},
+                ]
+        if max_tokens is not None:
+            payload["max_output_tokens"] = max_tokens
+
+        try:
+            response = self._session.post(
+                f"{self.openai_endpoint}responses",
+                json=payload,
+                timeout=RESPONSE_TIMEOUT,
+            )
+            if response.status_code in (404, 405, 501):
+                print("Responses API not supported, resending full history instead")
+                self._server_session = False
+                return None
+            response.raise_for_status()
+            body = response.json()
+        except LLM_UNREACHABLE_ERRORS:
+            raise
+        except (requests.RequestException, ValueError) as e:
+            return f"{BACKEND_ERROR_PREFIX}: {str(e)}"
+
+        self._response_ids.append(body["id"])
+        return "".join(
+            part.get("text", "")
+            for item in body.get("output", [])
+            if item.get("type") == "message"
+            for part in item.get("content", [])
+            if part.get("type") == "output_text"
+        )
+
+    def list_models(self, timeout: float = 5) -> List[str]:
+        """List model identifiers registered with the LlamaStack server"""
+        response = self._session.get(f"{self.api_url}/v1/models", timeout=timeout)
+        response.raise_for_status()
+        return [m.get("identifier") for m in response.json().get("data", [])]
 
     def is_available(self) -> bool:
-        """Check if LlamaStack is available"""
+        """Check if LlamaStack is available and serves the configured model
+
+        Lists models instead of running a chat completion, and reuses the
+        answer for AVAILABILITY_TTL seconds.
+        """
+        now = time.monotonic()
+        if (
+            self._avail_checked_at is not None
+            and now - self._avail_checked_at < AVAILABILITY_TTL
+        ):
+            return self._avail_result
+
         try:
-            # Try a minimal chat completion to verify service
-            response = self.llm.invoke([HumanMessage(content="hi")])
-            return bool(response.content)
+            models = self.list_models(timeout=2)
+            result = self.model in models
+            if not models:
+                # Server is up but would fail every query for lack of a model
+                print("LLM availability check failed: no models registered")
+            elif not result:
+                print(f"LLM availability check failed: {self.model} not in {models}")
         except Exception as e:
             # Print error for debugging
             print(f"LLM availability check failed: {e}")
-            return False
+            result = False
+
+        self._avail_checked_at = now
+        self._avail_result = result
+        return result
 
     def send_message(
         self,
@@ -98,45 +287,45 @@ class LlamaStackLLM:
     ) -> str:
         """Send a message with conversation history for follow-ups"""
 
-        # Build messages list with history
-        messages = []
+        response = None
+        if self._server_session:
+            response = self._respond(
+                user_message, system_message, temperature, max_tokens
+            )
+
+        if response is None:
+            # Build messages list with history
+            messages = []
 
-        # Add system message if provided (only at start)
-        if system_message and len(self.conversation_history) == 0:
-            messages.append({"role": "system", "content": system_message})
+            # Add system message if provided (only at start)
+            if system_message and len(self.conversation_history) == 0:
+                messages.append({"role": "system", "content": system_message})
 
-        # Add conversation history (keep only recent messages based on max_history)
-        start_idx = max(0, len(self.conversation_history) - self.max_history * 2)
-        messages.extend(self.conversation_history[start_idx:])
+            # Add conversation history (already bounded to max_history exchanges)
+            messages.extend(self.conversation_history)
 
-        # Add new user message
-        messages.append({"role": "user", "content": user_message})
+            # Add new user message
+            messages.append({"role": "user", "content": user_message})
 
-        # Get response
-        response = self.chat_completion(messages, temperature, max_tokens)
+            # Get response
+            response = self.chat_completion(messages, temperature, max_tokens)
 
         # Store in history (if not an error message)
         if not response.startswith("Error"):
             self.conversation_history.append({"role": "user", "content": user_message})
             self.conversation_history.append({"role": "assistant", "content": response})
 
-            # Trim history if it gets too long
-            if len(self.conversation_history) > self.max_history * 2:
-                # Keep system message if present, then trim oldest exchanges
-                self.conversation_history = self.conversation_history[
-                    -(self.max_history * 2) :
-                ]
-
         return response
 
     def clear_history(self):
         """Clear conversation history - useful for starting fresh"""
-        self.conversation_history = []
+        self.conversation_history.clear()
+        self._response_ids.clear()
         self.session_start = datetime.now()
 
     def get_history(self) -> List[Dict[str, str]]:
         """Get the current conversation history"""
-        return self.conversation_history.copy()
+        return list(self.conversation_history)
 
     def get_history_summary(self) -> Dict[str, any]:
         """Get summary of conversation state"""
@@ -151,6 +340,10 @@ class LlamaStackLLM:
     def undo_last_exchange(self):
         """Remove the last user message and assistant response"""
         if len(self.conversation_history) >= 2:
-            self.conversation_history = self.conversation_history[:-2]
+            self.conversation_history.pop()
+            self.conversation_history.pop()
+            if self._response_ids:
+                # The next turn chains on the exchange before the undone one
+                self._response_ids.pop()
             return True
         return False
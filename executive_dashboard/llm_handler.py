@@ -1,16 +1,208 @@
+import re
+from functools import lru_cache
 from typing import Any, Dict, List
 
+import numpy as np
+import pandas as pd
+import requests
 
-class QueryPromptBuilder:
-    @staticmethod
-    def build_system_prompt(data_context: Dict[str, Any]) -> str:
-        return f"""You are an expert retail analytics assistant helping C-suite executives analyze business data.
+from response_cache import normalize_question
+
+try:
+    import ahocorasick
+
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+try:
+    import openai
+
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+# Errors meaning the LLM server could not be reached at all. LlamaStackLLM
+# raises these instead of returning error text, so callers can skip further
+# LLM calls and answer from the data alone.
+LLM_UNREACHABLE_ERRORS = (
+    ConnectionError,
+    TimeoutError,
+    requests.ConnectionError,
+    requests.Timeout,
+)
+if OPENAI_AVAILABLE:
+    # ChatLlamaStack talks through the OpenAI client (timeouts subclass this)
+    LLM_UNREACHABLE_ERRORS += (openai.APIConnectionError,)
+
+# Start of the text LlamaStackLLM returns in place of a response on API errors
+BACKEND_ERROR_PREFIX = "Error calling LlamaStack API"
+
+
+def is_backend_error(response) -> bool:
+    """True for the error text a backend returned instead of a response"""
+    return isinstance(response, str) and response.startswith(BACKEND_ERROR_PREFIX)
+
+
+# Keywords voting for each query type in QueryPromptBuilder.classify_query
+QUERY_KEYWORDS = {
+    "performance": frozenset(
+        {
+            "sales",
+            "revenue",
+            "performance",
+            "trend",
+            "growth",
+            "volume",
+            "q1",
+            "q2",
+            "q3",
+            "q4",
+            "quarter",
+            "month",
+            "year",
+        }
+    ),
+    "comparison": frozenset(
+        {
+            "compare",
+            "versus",
+            "vs",
+            "difference",
+            "better",
+            "worse",
+            "than",
+            "last year",
+            "this year",
+        }
+    ),
+    "anomaly": frozenset(
+        {
+            "underperforming",
+            "overperforming",
+            "outlier",
+            "unusual",
+            "anomaly",
+            "spike",
+            "drop",
+            "concern",
+            "problem",
+        }
+    ),
+    "drilldown": frozenset(
+        {
+            "why",
+            "what's driving",
+            "cause",
+            "reason",
+            "breakdown",
+            "detail",
+            "explain",
+            "factors",
+        }
+    ),
+}
+
+
+def _build_keyword_automaton():
+    automaton = ahocorasick.Automaton()
+    for category, keywords in QUERY_KEYWORDS.items():
+        for keyword in keywords:
+            automaton.add_word(keyword, (category, keyword))
+    automaton.make_automaton()
+    return automaton
+
+
+_KEYWORD_AUTOMATON = _build_keyword_automaton() if AHOCORASICK_AVAILABLE else None
+
+# Fallback matcher: a zero-width lookahead reports every keyword occurrence,
+# overlapping ones included, so this keeps plain substring semantics (as long
+# as no keyword is a prefix of another keyword in the same category)
+_CATEGORY_PATTERNS = {
+    category: re.compile(
+        "(?=(" + "|".join(map(re.escape, sorted(keywords))) + "))"
+    )
+    for category, keywords in QUERY_KEYWORDS.items()
+}
+
+# Most keywords any category after each position could still match; once the
+# best score reaches it no later category can win (ties go to the earlier one)
+_SCORE_CEILINGS = {
+    category: max(
+        (len(QUERY_KEYWORDS[later]) for later in list(QUERY_KEYWORDS)[i + 1 :]),
+        default=0,
+    )
+    for i, category in enumerate(QUERY_KEYWORDS)
+}
+
+
+@lru_cache(maxsize=1024)
+def _classify_normalized(question_lower: str) -> str:
+    scores = dict.fromkeys(QUERY_KEYWORDS, 0)
+
+    if _KEYWORD_AUTOMATON is not None:
+        # One pass over the question; a keyword found twice still counts once
+        seen = set()
+        for _, (category, keyword) in _KEYWORD_AUTOMATON.iter(question_lower):
+            if keyword not in seen:
+                seen.add(keyword)
+                scores[category] += 1
+    else:
+        best = 0
+        for category, pattern in _CATEGORY_PATTERNS.items():
+            scores[category] = len(set(pattern.findall(question_lower)))
+            best = max(best, scores[category])
+            if best >= _SCORE_CEILINGS[category]:
+                break
+
+    if max(scores.values()) == 0:
+        return "general"
+
+    return max(scores, key=scores.get)
+
+
+# System prompts for the four classified query types
+PERFORMANCE_SYSTEM_PROMPT = """You are analyzing performance metrics for a retail chain.
+Focus on: revenue trends, sales volumes, transaction counts, growth rates.
+Provide specific numbers, percentages, and clear comparisons."""
+
+COMPARISON_SYSTEM_PROMPT = """You are comparing business metrics across different dimensions.
+Focus on: period-over-period comparisons, regional differences, product category comparisons.
+Highlight significant differences and provide context."""
+
+ANOMALY_SYSTEM_PROMPT = """You are identifying and explaining anomalies in retail business data.
+Focus on: outliers, unusual patterns, underperformance, overperformance.
+Provide statistical context (standard deviations, percentiles) when relevant."""
+
+DRILLDOWN_SYSTEM_PROMPT = """You are conducting a deep-dive analysis to understand root causes.
+Focus on: cost drivers, revenue components, operational factors.
+Break down complex metrics into understandable components."""
+
+# System prompt per classify_query() result; "general" builds one from the data
+QUERY_TYPE_SYSTEM_PROMPTS = {
+    "performance": PERFORMANCE_SYSTEM_PROMPT,
+    "comparison": COMPARISON_SYSTEM_PROMPT,
+    "anomaly": ANOMALY_SYSTEM_PROMPT,
+    "drilldown": DRILLDOWN_SYSTEM_PROMPT,
+}
+
+# Shared system turns for the build_*_query_prompt message lists; every call
+# returns these same dicts, so they must never be mutated
+_PERFORMANCE_SYSTEM_MESSAGE = {"role": "system", "content": PERFORMANCE_SYSTEM_PROMPT}
+_COMPARISON_SYSTEM_MESSAGE = {"role": "system", "content": COMPARISON_SYSTEM_PROMPT}
+_ANOMALY_SYSTEM_MESSAGE = {"role": "system", "content": ANOMALY_SYSTEM_PROMPT}
+_DRILLDOWN_SYSTEM_MESSAGE = {"role": "system", "content": DRILLDOWN_SYSTEM_PROMPT}
+
+
+@lru_cache(maxsize=32)
+def _build_system_prompt_cached(total_stores, total_products, regions, date_range):
+    return f"""You are an expert retail analytics assistant helping C-suite executives analyze business data.
 
 **Available Data Context:**
-- Total Stores: {data_context.get('total_stores', 'N/A')}
-- Total Products: {data_context.get('total_products', 'N/A')}
-- Regions: {', '.join(data_context.get('regions', []))}
-- Date Range: {data_context.get('date_range', 'N/A')}
+- Total Stores: {total_stores}
+- Total Products: {total_products}
+- Regions: {', '.join(regions)}
+- Date Range: {date_range}
 - Available Metrics: Revenue, Costs, Profit Margins, Inventory, Customer Satisfaction
 
 **Data Columns Available:**
@@ -31,17 +223,23 @@ class QueryPromptBuilder:
 - Highlight key insights and recommendations
 - Use markdown formatting for clarity"""
 
+
+class QueryPromptBuilder:
+    @staticmethod
+    def build_system_prompt(data_context: Dict[str, Any]) -> str:
+        return _build_system_prompt_cached(
+            data_context.get("total_stores", "N/A"),
+            data_context.get("total_products", "N/A"),
+            tuple(data_context.get("regions", ())),
+            data_context.get("date_range", "N/A"),
+        )
+
     @staticmethod
     def build_performance_query_prompt(
         question: str, data_summary: str
     ) -> List[Dict[str, str]]:
         return [
-            {
-                "role": "system",
-                "content": """You are analyzing performance metrics for a retail chain.
-Focus on: revenue trends, sales volumes, transaction counts, growth rates.
-Provide specific numbers, percentages, and clear comparisons.""",
-            },
+            _PERFORMANCE_SYSTEM_MESSAGE,
             {
                 "role": "user",
                 "content": f"""Question: {question}
@@ -63,12 +261,7 @@ Please analyze the performance data and provide:
         question: str, data_summary: str
     ) -> List[Dict[str, str]]:
         return [
-            {
-                "role": "system",
-                "content": """You are comparing business metrics across different dimensions.
-Focus on: period-over-period comparisons, regional differences, product category comparisons.
-Highlight significant differences and provide context.""",
-            },
+            _COMPARISON_SYSTEM_MESSAGE,
             {
                 "role": "user",
                 "content": f"""Question: {question}
@@ -90,12 +283,7 @@ Please provide a comparison analysis including:
         question: str, data_summary: str
     ) -> List[Dict[str, str]]:
         return [
-            {
-                "role": "system",
-                "content": """You are identifying and explaining anomalies in retail business data.
-Focus on: outliers, unusual patterns, underperformance, overperformance.
-Provide statistical context (standard deviations, percentiles) when relevant.""",
-            },
+            _ANOMALY_SYSTEM_MESSAGE,
             {
                 "role": "user",
                 "content": f"""Question: {question}
@@ -117,12 +305,7 @@ Please identify and analyze anomalies:
         question: str, data_summary: str
     ) -> List[Dict[str, str]]:
         return [
-            {
-                "role": "system",
-                "content": """You are conducting a deep-dive analysis to understand root causes.
-Focus on: cost drivers, revenue components, operational factors.
-Break down complex metrics into understandable components.""",
-            },
+            _DRILLDOWN_SYSTEM_MESSAGE,
             {
                 "role": "user",
                 "content": f"""Question: {question}
@@ -141,165 +324,180 @@ Please provide a drill-down analysis:
 
     @staticmethod
     def classify_query(question: str) -> str:
-        question_lower = question.lower()
+        # Same normalized form as the response caches, so a question keeps one
+        # query type (and cache scope) however it is spaced or capitalized
+        return _classify_normalized(normalize_question(question))
 
-        performance_keywords = [
-            "sales",
-            "revenue",
-            "performance",
-            "trend",
-            "growth",
-            "volume",
-            "q1",
-            "q2",
-            "q3",
-            "q4",
-            "quarter",
-            "month",
-            "year",
-        ]
-        comparison_keywords = [
-            "compare",
-            "versus",
-            "vs",
-            "difference",
-            "better",
-            "worse",
-            "than",
-            "last year",
-            "this year",
-        ]
-        anomaly_keywords = [
-            "underperforming",
-            "overperforming",
-            "outlier",
-            "unusual",
-            "anomaly",
-            "spike",
-            "drop",
-            "concern",
-            "problem",
-        ]
-        drilldown_keywords = [
-            "why",
-            "what's driving",
-            "cause",
-            "reason",
-            "breakdown",
-            "detail",
-            "explain",
-            "factors",
-        ]
 
-        scores = {
-            "performance": sum(
-                1 for kw in performance_keywords if kw in question_lower
-            ),
-            "comparison": sum(1 for kw in comparison_keywords if kw in question_lower),
-            "anomaly": sum(1 for kw in anomaly_keywords if kw in question_lower),
-            "drilldown": sum(1 for kw in drilldown_keywords if kw in question_lower),
-        }
+# One-off message list builder per classify_query() result; "general" has none
+QUERY_TYPE_PROMPT_BUILDERS = {
+    "performance": QueryPromptBuilder.build_performance_query_prompt,
+    "comparison": QueryPromptBuilder.build_comparison_query_prompt,
+    "anomaly": QueryPromptBuilder.build_anomaly_query_prompt,
+    "drilldown": QueryPromptBuilder.build_drilldown_query_prompt,
+}
+
+
+def _top_bottom_k(df, column: str, k: int):
+    """Rows with the k largest and k smallest values of a column, best first
+
+    Both extremes come from argpartition (linear time) and only the 2k
+    selected rows are sorted, instead of two separate nlargest/nsmallest calls.
+    """
+    values = df[column].to_numpy()
+    if len(values) <= k:
+        order = np.argsort(values, kind="stable")
+        return df.iloc[order[::-1]], df.iloc[order]
+
+    top = np.argpartition(values, len(values) - k)[-k:]
+    bottom = np.argpartition(values, k - 1)[:k]
+    top = top[np.argsort(-values[top], kind="stable")]
+    bottom = bottom[np.argsort(values[bottom], kind="stable")]
+    return df.iloc[top], df.iloc[bottom]
+
 
-        if max(scores.values()) == 0:
-            return "general"
+def _nunique_fast(s: pd.Series) -> int:
+    """Series.nunique() with a sort-based count for small/medium integer columns
 
-        return max(scores, key=scores.get)
+    Integer IDs cannot hold NaN, so np.unique gives the same answer as pandas'
+    hashtable and is quicker below ~1e6 rows. Other dtypes (e.g. the string
+    CustomerIDs in the bundled data) keep the NaN-dropping pandas path.
+    """
+    values = s.to_numpy()
+    if values.dtype.kind in "iu" and values.size < 1_000_000:
+        return len(np.unique(values))
+    return s.nunique()
+
+
+def _format_cell(value) -> str:
+    return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+
+def _format_table(df) -> str:
+    """Tab-separated rendering of a small aggregate table, one line per row
+
+    Much cheaper than DataFrame.to_string() for the 3-10 row tables that go
+    into the LLM prompt. Floats are shown with 2 decimals.
+    """
+    lines = ["\t".join([str(df.index.name or ""), *map(str, df.columns)])]
+    for label, row in zip(df.index, df.itertuples(index=False)):
+        lines.append("\t".join([str(label), *map(_format_cell, row)]))
+    return "\n".join(lines) + "\n"
 
 
 class DataContextBuilder:
     def __init__(self, data_loader):
         self.data_loader = data_loader
+        # (loader fingerprint, result) of the last build; reused until a reload
+        self._context_cache = (None, None)
+        self._summary_cache = (None, None)
 
     def build_context(self) -> Dict[str, Any]:
+        if self._context_cache[0] == self.data_loader.fingerprint():
+            return self._context_cache[1]
+
         context = {}
 
         if self.data_loader.store_transactions is not None:
-            stores = self.data_loader.store_transactions["StoreID"].unique()
-            context["total_stores"] = len(stores)
+            # dropna=False counts a missing ID like len(unique()) did
+            context["total_stores"] = self.data_loader.store_transactions[
+                "StoreID"
+            ].nunique(dropna=False)
 
             if "Date" in self.data_loader.store_transactions.columns:
-                dates = self.data_loader.store_transactions["Date"]
-                context["date_range"] = f"{dates.min()} to {dates.max()}"
+                first, last = self.data_loader.column_bounds(
+                    "store_transactions", "Date"
+                )
+                context["date_range"] = f"{first} to {last}"
 
         if self.data_loader.product_sales is not None:
-            regions = self.data_loader.product_sales["Region"].unique()
-            context["regions"] = list(regions)
+            context["regions"] = (
+                self.data_loader.product_sales["Region"].drop_duplicates().tolist()
+            )
 
-            products = self.data_loader.product_sales["Product"].unique()
-            context["total_products"] = len(products)
+            context["total_products"] = self.data_loader.product_sales[
+                "Product"
+            ].nunique(dropna=False)
 
         if self.data_loader.inventory_data is not None:
             context["inventory_items"] = len(self.data_loader.inventory_data)
 
+        self._context_cache = (self.data_loader.fingerprint(), context)
         return context
 
     def build_data_summary(self, query_type: str = "general") -> str:
-        summary_parts = []
+        # The summary does not depend on query_type, so only the data is keyed
+        if self._summary_cache[0] == self.data_loader.fingerprint():
+            return self._summary_cache[1]
+
+        # Sections are appended piecewise and joined once at the end
+        parts: List[str] = []
 
         if self.data_loader.store_transactions is not None:
             df = self.data_loader.store_transactions
-            total_revenue = df["TotalPrice"].sum()
-            avg_transaction = df["TotalPrice"].mean()
+            # One grouped pass; the overall totals are derived from it
+            # Unsorted groups: only totals and a top/bottom selection are taken
+            store_summary = df.groupby(
+                "StoreID", observed=True, sort=False, dropna=False
+            )["TotalPrice"].agg(["sum", "count", "mean"])
+            total_revenue = store_summary["sum"].sum()
+            avg_transaction = total_revenue / store_summary["count"].sum()
             transaction_count = len(df)
 
-            store_summary = (
-                df.groupby("StoreID")["TotalPrice"]
-                .agg(["sum", "count", "mean"])
-                .round(2)
-            )
-            top_stores = store_summary.nlargest(3, "sum")
-            bottom_stores = store_summary.nsmallest(3, "sum")
-
-            summary_parts.append(
-                f"""**Store Performance:**
-- Total Revenue: ${total_revenue:,.2f}
-- Total Transactions: {transaction_count:,}
-- Average Transaction: ${avg_transaction:.2f}
+            store_summary = store_summary[store_summary.index.notna()]
+            top_stores, bottom_stores = _top_bottom_k(store_summary, "sum", 3)
 
-Top 3 Stores by Revenue:
-{top_stores.to_string()}
-
-Bottom 3 Stores by Revenue:
-{bottom_stores.to_string()}
-"""
-            )
+            parts += [
+                "**Store Performance:**\n",
+                f"- Total Revenue: ${total_revenue:,.2f}\n",
+                f"- Total Transactions: {transaction_count:,}\n",
+                f"- Average Transaction: ${avg_transaction:.2f}\n",
+                "\nTop 3 Stores by Revenue:\n",
+                _format_table(top_stores),
+                "\nBottom 3 Stores by Revenue:\n",
+                _format_table(bottom_stores),
+            ]
 
         if self.data_loader.product_sales is not None:
             df = self.data_loader.product_sales
 
-            regional_summary = (
-                df.groupby("Region")
-                .agg({"TotalPrice": "sum", "Quantity": "sum"})
-                .round(2)
+            regional_summary = df.groupby("Region", observed=True).agg(
+                {"TotalPrice": "sum", "Quantity": "sum"}
             )
 
-            summary_parts.append(
-                f"""**Regional Performance:**
-{regional_summary.to_string()}
-"""
-            )
+            if parts:
+                parts.append("\n")
+            parts += ["**Regional Performance:**\n", _format_table(regional_summary)]
 
         if self.data_loader.inventory_data is not None:
             df = self.data_loader.inventory_data
-            low_stock_count = len(df[df["QuantityInStock"] < df["ReorderPoint"]])
-
-            summary_parts.append(
-                f"""**Inventory Status:**
-- Total Items: {len(df)}
-- Low Stock Items: {low_stock_count}
-- Average Stock Level: {df['QuantityInStock'].mean():.0f}
-"""
+            low_stock_count = int(
+                np.count_nonzero(
+                    df["QuantityInStock"].to_numpy() < df["ReorderPoint"].to_numpy()
+                )
             )
 
+            if parts:
+                parts.append("\n")
+            parts += [
+                "**Inventory Status:**\n",
+                f"- Total Items: {len(df)}\n",
+                f"- Low Stock Items: {low_stock_count}\n",
+                f"- Average Stock Level: {df['QuantityInStock'].mean():.0f}\n",
+            ]
+
         if self.data_loader.customer_data is not None:
             df = self.data_loader.customer_data
             if "ReviewRating" in df.columns:
                 avg_rating = df["ReviewRating"].mean()
-                summary_parts.append(
-                    f"""**Customer Metrics:**
-- Average Rating: {avg_rating:.2f}/5.0
-- Total Customers: {df['CustomerID'].nunique()}
-"""
-                )
-
-        return "\n".join(summary_parts)
+                if parts:
+                    parts.append("\n")
+                parts += [
+                    "**Customer Metrics:**\n",
+                    f"- Average Rating: {avg_rating:.2f}/5.0\n",
+                    f"- Total Customers: {_nunique_fast(df['CustomerID'])}\n",
+                ]
+
+        summary = "".join(parts)
+        self._summary_cache = (self.data_loader.fingerprint(), summary)
+        return summary
@@ -1,13 +1,197 @@
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
 
+try:
+    import polars as pl
+except ImportError:
+    pl = None
+
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import numexpr as ne
+except ImportError:
+    ne = None
+
+# Row count from which element-wise cost arithmetic runs multi-threaded in
+# numexpr; like pandas' own numexpr cutoff, smaller arrays stay in NumPy
+NUMEXPR_MIN_ROWS = 1_000_000
+
+
+def _scan_anomalies(
+    totals: np.ndarray, threshold: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Positions, |z-scores| and % deviation from the mean of flagged totals"""
+    if totals.shape[0] < 2:
+        return np.empty(0, np.int64), np.empty(0), np.empty(0)
+
+    mean = totals.mean()
+    std = totals.std(ddof=1)
+    # With no spread every z-score is 0 and nothing can be flagged
+    if not std > 0:
+        return np.empty(0, np.int64), np.empty(0), np.empty(0)
+
+    z_scores = np.abs((totals - mean) / std)
+    idx = np.flatnonzero(z_scores > threshold)
+    return idx, z_scores[idx], (totals[idx] - mean) / mean * 100
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True)
+    def _scan_anomalies(totals, threshold):  # noqa: F811
+        # Same contract as the NumPy version: mean, sample std, z-scores and
+        # the threshold filter in two compiled passes, without temporaries
+        n = totals.shape[0]
+        if n < 2:
+            return np.empty(0, np.int64), np.empty(0), np.empty(0)
+
+        mean = 0.0
+        for i in range(n):
+            mean += totals[i]
+        mean /= n
+
+        sq = 0.0
+        for i in range(n):
+            sq += (totals[i] - mean) ** 2
+        std = np.sqrt(sq / (n - 1))
+        if not std > 0:
+            return np.empty(0, np.int64), np.empty(0), np.empty(0)
+
+        idx = np.empty(n, np.int64)
+        z_out = np.empty(n)
+        pct_out = np.empty(n)
+        count = 0
+        for i in range(n):
+            z = abs((totals[i] - mean) / std)
+            if z > threshold:
+                idx[count] = i
+                z_out[count] = z
+                pct_out[count] = (totals[i] - mean) / mean * 100
+                count += 1
+        return idx[:count], z_out[:count], pct_out[:count]
+
 
 class MetricsCalculator:
     def __init__(self, data_loader):
         self.data_loader = data_loader
+        # (frame key, TotalPrice as a float64 array) for the scalar revenue metrics
+        self._total_price_cache = (None, None)
+        # (frame key, per-store TotalPrice sum/count) shared by several metrics
+        self._store_totals_cache = (None, None)
+        # (frame key, (q10, q25) of QuantityInStock) for the low-stock checks
+        self._inv_quantiles_cache = (None, None)
+        # (kind, id(frame)) -> first column whose name matches that kind
+        self._col_cache: Dict[Tuple[str, int], str] = {}
+        # (frame key, mean UnitCost per ProductName) used to cost product sales
+        self._unit_cost_cache = (None, None)
+        # Result name -> (loader fingerprint, result) for the dashboard getters
+        self._result_cache: Dict[str, Tuple[tuple, Any]] = {}
+
+    def _memoized(self, name: str, compute: Callable[[], Any]) -> Any:
+        """compute() once per data version; callers must not modify the result"""
+        fingerprint = self.data_loader.fingerprint()
+        cached = self._result_cache.get(name)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        result = compute()
+        self._result_cache[name] = (fingerprint, result)
+        return result
+
+    def _find_column(
+        self, df: pd.DataFrame, kind: str, keywords: Tuple[str, ...]
+    ) -> Optional[str]:
+        """First column whose lowercased name contains one of the keywords"""
+        key = (kind, id(df))
+        col = self._col_cache.get(key)
+        # The membership check guards against a recycled id() of another frame
+        if col is not None and col in df.columns:
+            return col
+
+        col = next(
+            (
+                name
+                for name in df.columns
+                if any(keyword in name.lower() for keyword in keywords)
+            ),
+            None,
+        )
+        if col is not None:
+            self._col_cache[key] = col
+        return col
+
+    def _total_prices(self, transactions: pd.DataFrame) -> np.ndarray:
+        """TotalPrice pulled out of pandas once per loaded frame"""
+        key = (id(transactions), len(transactions))
+        if self._total_price_cache[0] != key:
+            prices = transactions["TotalPrice"].to_numpy(dtype=np.float64)
+            self._total_price_cache = (key, prices)
+        return self._total_price_cache[1]
+
+    def _store_totals(self, transactions: pd.DataFrame) -> pd.DataFrame:
+        """Per-store TotalPrice sum and count, grouped once per loaded frame
+
+        Rows with a missing StoreID are kept as their own group so the grand
+        totals derived from this frame match the ungrouped column. Callers must
+        not modify the returned frame.
+        """
+        key = (id(transactions), len(transactions))
+        if self._store_totals_cache[0] != key:
+            totals = transactions.groupby("StoreID", observed=True, dropna=False)[
+                "TotalPrice"
+            ].agg(["sum", "count"])
+            self._store_totals_cache = (key, totals)
+        return self._store_totals_cache[1]
+
+    def _unit_costs(self, inventory: pd.DataFrame) -> Dict[str, float]:
+        """Mean inventory UnitCost per product name
+
+        The inventory lists each product many times, so joining sales against
+        it row by row would repeat every sale once per inventory entry.
+        """
+        key = (id(inventory), len(inventory))
+        if self._unit_cost_cache[0] != key:
+            costs = inventory.groupby("ProductName", observed=True, sort=False)[
+                "UnitCost"
+            ].mean()
+            self._unit_cost_cache = (key, costs.to_dict())
+        return self._unit_cost_cache[1]
+
+    def _sales_costs(
+        self, product_sales: pd.DataFrame, inventory: pd.DataFrame
+    ) -> np.ndarray:
+        """Cost of each product_sales row, NaN for products missing from inventory
+
+        Callers reduce with NaN-skipping sums, which counts those rows as 0
+        without a separate fillna pass. Returned as a bare array so it is never
+        attached to the shared frame.
+        """
+        # On a categorical column map() only touches the categories; the
+        # result can itself be categorical, hence the cast
+        unit_cost = product_sales["Product"].map(self._unit_costs(inventory))
+        unit_cost = unit_cost.to_numpy(dtype=np.float64)
+        quantity = product_sales["Quantity"].to_numpy()
+        if ne is not None and len(quantity) >= NUMEXPR_MIN_ROWS:
+            return ne.evaluate("unit_cost * quantity")
+        return unit_cost * quantity
+
+    def _inventory_quantiles(self, inventory: pd.DataFrame) -> Tuple[float, float]:
+        """10th and 25th percentile of QuantityInStock, from one shared sort"""
+        key = (id(inventory), len(inventory))
+        if self._inv_quantiles_cache[0] != key:
+            stock = inventory["QuantityInStock"].to_numpy(dtype=np.float64)
+            q10, q25 = np.nanquantile(stock, [0.1, 0.25])
+            self._inv_quantiles_cache = (key, (q10, q25))
+        return self._inv_quantiles_cache[1]
 
     def calculate_revenue_metrics(self) -> Dict[str, float]:
         transactions = self.data_loader.store_transactions
@@ -16,20 +200,21 @@ class MetricsCalculator:
         metrics = {}
 
         if transactions is not None and "TotalPrice" in transactions.columns:
-            metrics["store_revenue"] = transactions["TotalPrice"].sum()
-            metrics["avg_transaction"] = transactions["TotalPrice"].mean()
-            metrics["transaction_count"] = len(transactions)
+            prices = self._total_prices(transactions)
+            # NaN-skipping like Series.sum()/mean()
+            priced = np.count_nonzero(~np.isnan(prices))
+            metrics["store_revenue"] = np.nansum(prices)
+            metrics["avg_transaction"] = (
+                metrics["store_revenue"] / priced if priced else np.nan
+            )
+            metrics["transaction_count"] = len(prices)
 
         if online is not None:
-            revenue_cols = [
-                col
-                for col in online.columns
-                if "price" in col.lower()
-                or "total" in col.lower()
-                or "amount" in col.lower()
-            ]
-            if revenue_cols:
-                metrics["online_revenue"] = online[revenue_cols[0]].sum()
+            revenue_col = self._find_column(
+                online, "revenue", ("price", "total", "amount")
+            )
+            if revenue_col is not None:
+                metrics["online_revenue"] = online[revenue_col].sum()
 
         metrics["total_revenue"] = metrics.get("store_revenue", 0) + metrics.get(
             "online_revenue", 0
@@ -46,25 +231,14 @@ class MetricsCalculator:
 
         metrics = {}
 
-        # Merge with inventory_data to get UnitCost
+        # Cost each sale with its product's UnitCost from inventory_data
         if (
             inventory_data is not None
             and "UnitCost" in inventory_data.columns
             and "TotalPrice" in product_sales.columns
         ):
-            # Merge product_sales with inventory_data to get cost information
-            merged = product_sales.merge(
-                inventory_data[["ProductName", "UnitCost"]],
-                left_on="Product",
-                right_on="ProductName",
-                how="left"
-            )
-
-            # Calculate totals
-            total_revenue = merged["TotalPrice"].sum()
-            total_cost = (
-                merged["UnitCost"].fillna(0) * merged["Quantity"]
-            ).sum()
+            total_revenue = product_sales["TotalPrice"].sum()
+            total_cost = np.nansum(self._sales_costs(product_sales, inventory_data))
 
             metrics["overall_margin"] = (
                 ((total_revenue - total_cost) / total_revenue * 100)
@@ -86,11 +260,10 @@ class MetricsCalculator:
         if "QuantityInStock" in inventory.columns:
             metrics["total_inventory"] = inventory["QuantityInStock"].sum()
             metrics["avg_stock_level"] = inventory["QuantityInStock"].mean()
-            metrics["low_stock_items"] = len(
-                inventory[
-                    inventory["QuantityInStock"]
-                    < inventory["QuantityInStock"].quantile(0.25)
-                ]
+            stock = inventory["QuantityInStock"].to_numpy()
+            # Count the mask directly rather than materialising the filtered rows
+            metrics["low_stock_items"] = int(
+                np.count_nonzero(stock < self._inventory_quantiles(inventory)[1])
             )
 
         return metrics
@@ -103,14 +276,10 @@ class MetricsCalculator:
 
         metrics = {}
 
-        rating_cols = [
-            col
-            for col in customers.columns
-            if "rating" in col.lower() or "satisfaction" in col.lower()
-        ]
-        if rating_cols:
-            metrics["avg_satisfaction"] = customers[rating_cols[0]].mean()
-            metrics["satisfaction_std"] = customers[rating_cols[0]].std()
+        rating_col = self._find_column(customers, "rating", ("rating", "satisfaction"))
+        if rating_col is not None:
+            metrics["avg_satisfaction"] = customers[rating_col].mean()
+            metrics["satisfaction_std"] = customers[rating_col].std()
 
         if "Total Spent" in customers.columns or "Purchase Amount" in customers.columns:
             amount_col = (
@@ -123,6 +292,9 @@ class MetricsCalculator:
         return metrics
 
     def get_all_key_metrics(self) -> Dict[str, any]:
+        return self._memoized("key_metrics", self._key_metrics)
+
+    def _key_metrics(self) -> Dict[str, any]:
         return {
             "revenue": self.calculate_revenue_metrics(),
             "profit": self.calculate_profit_margins(),
@@ -131,70 +303,117 @@ class MetricsCalculator:
         }
 
     def get_store_performance(self) -> pd.DataFrame:
+        return self._memoized("store_performance", self._store_performance)
+
+    def _store_performance(self) -> pd.DataFrame:
         transactions = self.data_loader.store_transactions
 
         if transactions is None or "StoreID" not in transactions.columns:
             return pd.DataFrame()
 
-        store_metrics = (
-            transactions.groupby("StoreID")
-            .agg({"TotalPrice": ["sum", "mean", "count"]})
-            .round(2)
-        )
+        pl_transactions = self.data_loader.to_polars("store_transactions")
+        if pl_transactions is not None:
+            return (
+                # Null StoreIDs are dropped, as in the pandas branch below
+                pl_transactions.filter(pl.col("StoreID").is_not_null())
+                .group_by("StoreID")
+                .agg(
+                    pl.col("TotalPrice").sum().alias("Total_Revenue"),
+                    pl.col("TotalPrice").mean().alias("Avg_Transaction"),
+                    pl.col("TotalPrice")
+                    .count()
+                    .cast(pl.Int64)
+                    .alias("Transaction_Count"),
+                )
+                .sort("Total_Revenue", descending=True)
+                .to_pandas()
+                .set_index("StoreID")
+            )
 
-        store_metrics.columns = [
-            "Total_Revenue",
-            "Avg_Transaction",
-            "Transaction_Count",
-        ]
+        totals = self._store_totals(transactions)
+        totals = totals[totals.index.notna()]
+        store_metrics = pd.DataFrame(
+            {
+                "Total_Revenue": totals["sum"],
+                "Avg_Transaction": totals["sum"] / totals["count"],
+                "Transaction_Count": totals["count"],
+            }
+        )
         store_metrics = store_metrics.sort_values("Total_Revenue", ascending=False)
 
         return store_metrics
 
     def get_regional_performance(self) -> pd.DataFrame:
+        return self._memoized("regional_performance", self._regional_performance)
+
+    def _regional_performance(self) -> pd.DataFrame:
         product_sales = self.data_loader.product_sales
         inventory_data = self.data_loader.inventory_data
 
         if product_sales is None or "Region" not in product_sales.columns:
             return pd.DataFrame()
 
-        # Merge with inventory_data to get UnitCost
-        if inventory_data is not None and "UnitCost" in inventory_data.columns:
-            # Merge product_sales with inventory_data to get cost information
-            merged = product_sales.merge(
-                inventory_data[["ProductName", "UnitCost"]],
-                left_on="Product",
-                right_on="ProductName",
-                how="left"
-            )
-
-            # Calculate total cost (handle NaN values from left join)
-            merged["TotalCost"] = (
-                merged["UnitCost"].fillna(0) * merged["Quantity"]
-            )
+        pl_sales = self.data_loader.to_polars("product_sales")
+        pl_inventory = self.data_loader.to_polars("inventory_data")
 
-            # Calculate regional metrics
+        if (
+            pl_sales is not None
+            and pl_inventory is not None
+            and "UnitCost" in inventory_data.columns
+        ):
+            # Same costing + aggregation as below, run multi-threaded in Polars
+            unit_costs = pl_inventory.group_by(
+                pl.col("ProductName").cast(pl.String)
+            ).agg(pl.col("UnitCost").mean())
             regional_metrics = (
-                merged.groupby("Region")
-                .agg({"TotalPrice": "sum", "TotalCost": "sum"})
-                .round(2)
+                pl_sales.join(
+                    unit_costs,
+                    # Categorical keys must be cast to match the string side
+                    left_on=pl.col("Product").cast(pl.String),
+                    right_on="ProductName",
+                    how="left",
+                )
+                .group_by("Region")
+                .agg(
+                    pl.col("TotalPrice").sum(),
+                    (pl.col("UnitCost").fill_null(0) * pl.col("Quantity"))
+                    .sum()
+                    .alias("TotalCost"),
+                )
+                .to_pandas()
+                .set_index("Region")
             )
+        # Cost each sale with its product's UnitCost from inventory_data
+        elif inventory_data is not None and "UnitCost" in inventory_data.columns:
+            # Group a two-column frame of arrays by the Region column rather
+            # than adding a TotalCost column to the loader's product_sales
+            costs = pd.DataFrame(
+                {
+                    "TotalPrice": product_sales["TotalPrice"].to_numpy(),
+                    "TotalCost": self._sales_costs(product_sales, inventory_data),
+                },
+                index=product_sales.index,
+            )
+            regional_metrics = costs.groupby(
+                product_sales["Region"], observed=True, sort=False
+            ).sum()
         else:
             # Fallback: if no cost data available, set costs to 0
-            regional_metrics = (
-                product_sales.groupby("Region")
-                .agg({"TotalPrice": "sum"})
-                .round(2)
-            )
+            regional_metrics = product_sales.groupby(
+                "Region", observed=True, sort=False
+            ).agg({"TotalPrice": "sum"})
             regional_metrics["TotalCost"] = 0
 
         regional_metrics["Profit"] = (
             regional_metrics["TotalPrice"] - regional_metrics["TotalCost"]
         )
+        # Money columns keep full precision and are formatted where displayed;
+        # the margin is rounded since it is plotted and labelled as-is
         regional_metrics["Margin_%"] = (
             (regional_metrics["Profit"] / regional_metrics["TotalPrice"]) * 100
         ).round(2)
 
+        # Groups come out in first-seen order (sort=False); this is the one sort
         return regional_metrics.sort_values("TotalPrice", ascending=False)
 
     def detect_anomalies(self, threshold: float = 1.5) -> List[Dict[str, any]]:
@@ -202,34 +421,35 @@ class MetricsCalculator:
 
         transactions = self.data_loader.store_transactions
         if transactions is not None and "StoreID" in transactions.columns:
-            store_totals = transactions.groupby("StoreID")["TotalPrice"].sum()
-            mean_total = store_totals.mean()
-            std_total = store_totals.std()
-
-            for store_id, total in store_totals.items():
-                z_score = abs((total - mean_total) / std_total) if std_total > 0 else 0
-                if z_score > threshold:
-                    pct_change = (total - mean_total) / mean_total * 100
-                    anomalies.append(
-                        {
-                            "type": "store_revenue",
-                            "store_id": store_id,
-                            "message": f"Store {store_id}'s revenue is {abs(pct_change):.1f}% {'above' if pct_change > 0 else 'below'} average",
-                            "severity": "high" if z_score > 2 else "medium",
-                        }
-                    )
+            store_totals = self._store_totals(transactions)["sum"]
+            store_totals = store_totals[store_totals.index.notna()]
+            totals = store_totals.to_numpy(dtype=np.float64)
+
+            idx, z_scores, pct_changes = _scan_anomalies(totals, threshold)
+
+            # Only the flagged stores reach Python-level message formatting
+            for store_id, z_score, pct_change in zip(
+                store_totals.index[idx], z_scores, pct_changes
+            ):
+                anomalies.append(
+                    {
+                        "type": "store_revenue",
+                        "store_id": store_id,
+                        "message": f"Store {store_id}'s revenue is {abs(pct_change):.1f}% {'above' if pct_change > 0 else 'below'} average",
+                        "severity": "high" if z_score > 2 else "medium",
+                    }
+                )
 
         inventory = self.data_loader.inventory_data
         if inventory is not None and "QuantityInStock" in inventory.columns:
-            low_stock = inventory[
-                inventory["QuantityInStock"]
-                < inventory["QuantityInStock"].quantile(0.1)
-            ]
-            if len(low_stock) > 0:
+            stock = inventory["QuantityInStock"].to_numpy(dtype=np.float64)
+            q10, _ = self._inventory_quantiles(inventory)
+            low_stock = np.count_nonzero(stock < q10)
+            if low_stock > 0:
                 anomalies.append(
                     {
                         "type": "inventory",
-                        "message": f"{len(low_stock)} items have critically low stock levels",
+                        "message": f"{low_stock} items have critically low stock levels",
                         "severity": "high",
                     }
                 )
@@ -1,5 +1,8 @@
+import ast
 import re
 import traceback
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Any, Dict, Optional, Tuple
 
 import numpy as np
@@ -7,22 +10,134 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from llm_handler import is_backend_error
+from response_cache import ResponseCache, question_key_terms
+from visualizations import BASE_LAYOUT, _figure
 
-class PandasCodeGenerator:
-    """Generate and execute pandas code based on natural language queries using LLM"""
+try:
+    import numba  # noqa: F401
 
-    def __init__(self, llm_backend, data_loader):
-        self.llm = llm_backend
-        self.data_loader = data_loader
-        self.safe_imports = {
-            "pd": pd,
-            "np": np,
-        }
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
 
-    def generate_code(self, question: str, data_context: str) -> str:
-        """Ask LLM to generate pandas code for the query"""
+# Fenced code blocks in LLM responses, ```python first, then bare ```
+_PYTHON_BLOCK = re.compile(r"```python\n(.*?)```", re.DOTALL)
+_PLAIN_BLOCK = re.compile(r"```\n(.*?)```", re.DOTALL)
+
+# GroupBy reductions that accept engine="numba"
+NUMBA_GROUPBY_METHODS = frozenset({"sum", "mean", "min", "max", "std", "var"})
+
+# Below this many rows the one-off JIT compile costs more than it saves
+NUMBA_GROUPBY_MIN_ROWS = 1_000_000
+
+# Modules generated code may import (pd and np are already in scope)
+ALLOWED_IMPORTS = frozenset({"pandas", "numpy", "datetime", "math"})
 
-        system_prompt = """You are an expert Python data analyst. Generate pandas code to answer questions about retail data.
+# Columns left out of the frames handed to generated code because the system
+# prompt tells the model not to use them
+HIDDEN_COLUMNS = {
+    "store_transactions": ["Location"],
+    "store_transactions_by_date": ["Location"],
+}
+
+# Builtins generated code must not call
+BLOCKED_CALLS = frozenset(
+    {"eval", "exec", "compile", "open", "__import__", "globals", "locals", "vars"}
+)
+
+
+def _validate_ast(tree: ast.AST) -> None:
+    """Reject imports outside ALLOWED_IMPORTS, blocked builtins and dunder access"""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom):
+            modules = [node.module or ""]
+        else:
+            modules = []
+        for module in modules:
+            if module.split(".")[0] not in ALLOWED_IMPORTS:
+                raise ValueError(f"Generated code may not import {module!r}")
+
+        if (
+            isinstance(node, ast.Call)
+            and isinstance(node.func, ast.Name)
+            and node.func.id in BLOCKED_CALLS
+        ):
+            raise ValueError(f"Generated code may not call {node.func.id}()")
+        if isinstance(node, ast.Attribute) and node.attr.startswith("__"):
+            raise ValueError(f"Generated code may not access {node.attr}")
+        if isinstance(node, ast.Name) and node.id == "__builtins__":
+            raise ValueError("Generated code may not access __builtins__")
+
+
+@lru_cache(maxsize=128)
+def _compile_generated(code: str):
+    """Validated code object for a generated snippet
+
+    Parsed and checked once; repeated snippets are a cache hit. Raises
+    SyntaxError or ValueError for code that must not run.
+    """
+    tree = ast.parse(code, filename="<llm_generated>", mode="exec")
+    _validate_ast(tree)
+    return compile(tree, "<llm_generated>", "exec")
+
+
+def _is_groupby(node) -> bool:
+    """True for df.groupby(...) and df.groupby(...)[cols]"""
+    if isinstance(node, ast.Subscript):
+        node = node.value
+    return (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Attribute)
+        and node.func.attr == "groupby"
+    )
+
+
+class _NumbaGroupbyEngine(ast.NodeTransformer):
+    """Add engine="numba" to argument-free reductions on groupby objects"""
+
+    def __init__(self):
+        self.changed = False
+
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        func = node.func
+        if (
+            isinstance(func, ast.Attribute)
+            and func.attr in NUMBA_GROUPBY_METHODS
+            and not node.args
+            and not any(kw.arg == "engine" for kw in node.keywords)
+            and _is_groupby(func.value)
+        ):
+            node.keywords.append(ast.keyword("engine", ast.Constant("numba")))
+            node.keywords.append(
+                ast.keyword(
+                    "engine_kwargs",
+                    ast.Dict(
+                        [ast.Constant("parallel"), ast.Constant("nogil")],
+                        [ast.Constant(True), ast.Constant(True)],
+                    ),
+                )
+            )
+            self.changed = True
+        return node
+
+
+@lru_cache(maxsize=128)
+def _compile_with_numba_engine(code: str):
+    """Code object with groupby reductions on the Numba engine, or None if none"""
+    transformer = _NumbaGroupbyEngine()
+    tree = transformer.visit(ast.parse(code))
+    if not transformer.changed:
+        return None
+    return compile(ast.fix_missing_locations(tree), "<llm_generated>", "exec")
+
+
+# Fixed system prompts, sent byte-identical on every call so servers with
+# prefix caching (vLLM, OpenAI-compatible endpoints) reuse their prefill
+CODE_GENERATION_SYSTEM_PROMPT = """You are an expert Python data analyst. Generate pandas code to answer questions about retail data.
 
 **CRITICAL: Use ONLY the dataframes and columns listed below.**
 
@@ -37,6 +152,7 @@ class PandasCodeGenerator:
    - Columns: Date, Time, StoreID, Product, Quantity, UnitPrice, TotalPrice, PaymentType, TransactionID, Cashier, StoreManager, TimeOfDay, DayOfWeek
    - Use for: Store performance, transaction patterns
    - NOTE: Location column has data quality issues - use StoreID instead
+   - Date is already datetime64; no pd.to_datetime needed
 
 3. **inventory_data** - Product inventory with cost data
    - Columns: ProductID, ProductName, QuantityInStock, ReorderPoint, Supplier, SupplierContact, LeadTime, StorageLocation, UnitCost
@@ -47,11 +163,23 @@ class PandasCodeGenerator:
    - Columns: CustomerID, Product, PurchaseDate, Quantity, UnitPrice, CustomerName, ProductCategory, PaymentMethod, ReviewRating, TotalPrice
    - Use for: Customer behavior, product preferences
 
+5. **sales_with_cost** - product_sales with cost already joined (one row per sale)
+   - Columns: all product_sales columns plus UnitCost (the product's average inventory unit cost)
+   - Use for: Cost, profit and margin analysis by region, product or date
+
+6. **product_sales_by_region** - dict of Region name -> that region's product_sales rows
+   - Example: product_sales_by_region['East'] (same columns as product_sales)
+   - Use for: Single-region revenue/sales questions, instead of a boolean filter on product_sales
+
+7. **store_transactions_by_date** - store_transactions indexed by Date, sorted ascending
+   - Example: store_transactions_by_date.loc['2025-01-01':'2025-03-31'] (Date is the index, not a column)
+   - Use for: Date-range and period-over-period questions on store transactions
+
 **MANDATORY RULES:**
 
 1. **For COST questions** (expenses, costs, margins):
-   - MUST merge product_sales or store_transactions with inventory_data
-   - Join on: product_sales.Product = inventory_data.ProductName
+   - For sales/regional costs use sales_with_cost directly (already merged) - do NOT merge product_sales with inventory_data yourself
+   - For store costs merge store_transactions with inventory_data (join on: store_transactions.Product = inventory_data.ProductName)
    - Calculate: TotalCost = UnitCost × Quantity
 
 2. **For REVENUE/SALES questions** (revenue, sales, income):
@@ -59,9 +187,10 @@ class PandasCodeGenerator:
    - NO merge needed
 
 3. **For PROFIT/MARGIN questions**:
-   - Merge to get both TotalPrice (revenue) and UnitCost
+   - Use sales_with_cost, which has both TotalPrice (revenue) and UnitCost
    - Calculate: Profit = TotalPrice - (UnitCost × Quantity)
    - Calculate: Margin = (Profit / TotalPrice) × 100
+   - Compute row-level arithmetic columns with DataFrame.eval (one fused pass), e.g. sales_with_cost.eval("Profit = TotalPrice - UnitCost * Quantity")
 
 4. **CRITICAL:** Always store final result in a SINGLE variable called `result`
    - NEVER create multiple result variables like result_x, result_y
@@ -76,18 +205,10 @@ class PandasCodeGenerator:
 **Output Format:**
 Return ONLY the Python code, no explanations, no print statements.
 
-**Example 1 - Cost Analysis (requires merge):**
+**Example 1 - Cost Analysis (cost already joined):**
 ```python
-# Merge product_sales with inventory_data to get cost information
-merged = product_sales.merge(
-    inventory_data[['ProductName', 'UnitCost']],
-    left_on='Product',
-    right_on='ProductName',
-    how='left'
-)
-
 # Filter for the specified region
-region_data = merged[merged['Region'] == 'East']
+region_data = sales_with_cost[sales_with_cost['Region'] == 'East']
 
 # Calculate total cost by product
 product_costs = region_data.groupby('Product').agg({
@@ -103,8 +224,8 @@ result = product_costs.nlargest(10, 'TotalCost')[['Product', 'TotalCost', 'Quant
 
 **Example 2 - Revenue Analysis (no merge needed):**
 ```python
-# Filter for the specified region
-region_data = product_sales[product_sales['Region'] == 'East']
+# Rows for the specified region (pre-split, no filtering needed)
+region_data = product_sales_by_region['East']
 
 # Calculate total revenue by product
 product_revenue = region_data.groupby('Product').agg({
@@ -116,18 +237,10 @@ product_revenue = region_data.groupby('Product').agg({
 result = product_revenue.nlargest(10, 'TotalPrice')
 ```
 
-**Example 3 - Profit Analysis (requires merge):**
+**Example 3 - Profit Analysis (cost already joined):**
 ```python
-# Merge to get both revenue and cost data
-merged = product_sales.merge(
-    inventory_data[['ProductName', 'UnitCost']],
-    left_on='Product',
-    right_on='ProductName',
-    how='left'
-)
-
-# Calculate profit
-merged['Profit'] = merged['TotalPrice'] - (merged['UnitCost'] * merged['Quantity'])
+# Calculate profit in one fused pass (eval returns a new frame; sales_with_cost is left untouched)
+merged = sales_with_cost.eval("Profit = TotalPrice - UnitCost * Quantity")
 
 # Filter by region and analyze
 region_profit = merged[merged['Region'] == 'East'].groupby('Product').agg({
@@ -143,18 +256,16 @@ result = region_profit.nlargest(10, 'Profit')
 
 **Example 4 - Quarter over Quarter Comparison:**
 ```python
-# Convert date column to datetime
-store_transactions['Date'] = pd.to_datetime(store_transactions['Date'])
-
-# Get the latest date and define quarters
-latest_date = store_transactions['Date'].max()
+# Date is already datetime; store_transactions_by_date is sorted by it, so
+# date ranges are index slices rather than full-frame filters
+latest_date = store_transactions_by_date.index.max()
 last_quarter_start = latest_date - pd.DateOffset(months=3)
 quarter_before_start = latest_date - pd.DateOffset(months=6)
 
-# Filter data for each quarter
-last_quarter = store_transactions[store_transactions['Date'] >= last_quarter_start]
-quarter_before = store_transactions[(store_transactions['Date'] >= quarter_before_start) &
-                                   (store_transactions['Date'] < last_quarter_start)]
+# Slice each quarter (label slices include both ends)
+last_quarter = store_transactions_by_date.loc[last_quarter_start:]
+quarter_before = store_transactions_by_date.loc[quarter_before_start:last_quarter_start]
+quarter_before = quarter_before[quarter_before.index < last_quarter_start]
 
 # Calculate metrics for each quarter
 comparison = pd.DataFrame({
@@ -173,6 +284,77 @@ result = comparison
 ```
 """
 
+ANALYSIS_SYSTEM_PROMPT = """You are a retail analytics expert. Analyze data query results and provide clear insights for C-suite executives.
+
+**Your Response Should Include:**
+1. Direct answer to the question
+2. Key insights and patterns
+3. Specific numbers and percentages
+4. Business implications
+5. Recommendations (if applicable)
+
+Be concise, data-driven, and executive-friendly."""
+
+
+class PandasCodeGenerator:
+    """Generate and execute pandas code based on natural language queries using LLM
+
+    Each query makes up to two chat_completion calls on llm_backend, so the
+    backend should hold a long-lived, keep-alive HTTP client (LlamaStackLLM
+    shares one across its cached sampling configs) rather than connect per call.
+    """
+
+    def __init__(self, llm_backend, data_loader):
+        self.llm = llm_backend
+        self.data_loader = data_loader
+        self.safe_imports = {
+            "pd": pd,
+            "np": np,
+        }
+        # Generated code keyed on (question, data context) and analyses keyed
+        # on (question, formatted result), so repeated or near-identical
+        # questions skip the LLM round-trip
+        self._code_cache = ResponseCache(key_terms=self._question_key_terms)
+        self._analysis_cache = ResponseCache(key_terms=self._question_key_terms)
+        self._code_system_message = self._system_message(
+            CODE_GENERATION_SYSTEM_PROMPT
+        )
+        self._analysis_system_message = self._system_message(ANALYSIS_SYSTEM_PROMPT)
+        # (frame identities, globals dict) reused by execute_code
+        self._exec_globals = (None, None)
+        # (loader fingerprint, context string) from _build_data_context
+        self._data_context_cache = (None, None)
+
+    def _question_key_terms(self, question: str) -> frozenset:
+        """Terms two questions must share for a semantic cache hit"""
+        return question_key_terms(question, self.data_loader.entity_names)
+
+    def _system_message(self, prompt: str) -> Dict[str, Any]:
+        """System message for a fixed prompt
+
+        Backends that set supports_prompt_caching (e.g. Anthropic/Bedrock
+        adapters) get the prompt as a content block marked for ephemeral
+        provider-side caching; others rely on automatic prefix caching.
+        """
+        if getattr(self.llm, "supports_prompt_caching", False):
+            return {
+                "role": "system",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": prompt,
+                        "cache_control": {"type": "ephemeral"},
+                    }
+                ],
+            }
+        return {"role": "system", "content": prompt}
+
+    def generate_code(self, question: str, data_context: str) -> str:
+        """Ask LLM to generate pandas code for the query"""
+        cached = self._code_cache.get(question, data_context)
+        if cached is not None:
+            return cached
+
         user_message = f"""Question: {question}
 
 Data Context:
@@ -181,32 +363,31 @@ Data Context:
 Generate pandas code to answer this question using the available dataframes."""
 
         messages = [
-            {"role": "system", "content": system_prompt},
+            self._code_system_message,
             {"role": "user", "content": user_message},
         ]
 
         response = self.llm.chat_completion(messages, temperature=0.1, max_tokens=800)
+        if is_backend_error(response):
+            # Neither run nor cache the error text as if it were code
+            raise RuntimeError(response)
 
         # Extract code from markdown code blocks if present
         code = self._extract_code(response)
+        self._code_cache.put(question, code, data_context)
 
         return code
 
     def _extract_code(self, response: str) -> str:
         """Extract Python code from LLM response, handling markdown code blocks"""
-        # Try to extract from ```python ... ``` blocks
-        pattern = r"```python\n(.*?)```"
-        matches = re.findall(pattern, response, re.DOTALL)
-
-        if matches:
-            return matches[0].strip()
+        # Bare code (no fences at all) needs no regex scan
+        if "```" not in response:
+            return response.strip()
 
-        # Try to extract from ``` ... ``` blocks
-        pattern = r"```\n(.*?)```"
-        matches = re.findall(pattern, response, re.DOTALL)
-
-        if matches:
-            return matches[0].strip()
+        # Only the first block is used, so stop at the first match
+        match = _PYTHON_BLOCK.search(response) or _PLAIN_BLOCK.search(response)
+        if match:
+            return match.group(1).strip()
 
         # Return as-is if no code blocks found
         return response.strip()
@@ -214,22 +395,25 @@ Generate pandas code to answer this question using the available dataframes."""
     def execute_code(self, code: str) -> Dict[str, Any]:
         """Safely execute generated pandas code"""
 
-        # Prepare execution environment with dataframes
-        exec_globals = self.safe_imports.copy()
-        exec_globals.update(
-            {
-                "store_transactions": self.data_loader.store_transactions,
-                "product_sales": self.data_loader.product_sales,
-                "inventory_data": self.data_loader.inventory_data,
-                "customer_data": self.data_loader.customer_data,
-            }
-        )
-
+        exec_globals = self._get_exec_globals()
+        # Top-level assignments land here, so the shared globals stay clean
         exec_locals = {}
 
         try:
+            code_object = _compile_generated(code)
+            jitted = self._numba_variant(code, exec_globals)
+
             # Execute the code
-            exec(code, exec_globals, exec_locals)
+            if jitted is None:
+                exec(code_object, exec_globals, exec_locals)
+            else:
+                try:
+                    exec(jitted, exec_globals, exec_locals)
+                except Exception:
+                    # Numba kernels reject some dtypes (dates, strings);
+                    # rerun the snippet as written
+                    exec_locals = {}
+                    exec(code_object, exec_globals, exec_locals)
 
             # Get the result
             result = exec_locals.get("result", None)
@@ -256,6 +440,43 @@ Generate pandas code to answer this question using the available dataframes."""
                 "code": code,
             }
 
+    @staticmethod
+    def _numba_variant(code: str, exec_globals: Dict[str, Any]):
+        """Numba-engine version of the snippet when the data is large enough"""
+        if not NUMBA_AVAILABLE:
+            return None
+        rows = max(
+            (len(v) for v in exec_globals.values() if isinstance(v, pd.DataFrame)),
+            default=0,
+        )
+        if rows < NUMBA_GROUPBY_MIN_ROWS:
+            return None
+        return _compile_with_numba_engine(code)
+
+    def _get_exec_globals(self) -> Dict[str, Any]:
+        """Execution globals with the dataframes, rebuilt only when a frame changes"""
+        frames = {
+            "store_transactions": self.data_loader.store_transactions,
+            "product_sales": self.data_loader.product_sales,
+            "inventory_data": self.data_loader.inventory_data,
+            "customer_data": self.data_loader.customer_data,
+            "sales_with_cost": self.data_loader.sales_with_cost,
+            "product_sales_by_region": self.data_loader.product_sales_by_region,
+            "store_transactions_by_date": self.data_loader.store_transactions_by_date,
+        }
+        key = tuple(id(df) for df in frames.values())
+        if self._exec_globals[0] != key:
+            exec_globals = self.safe_imports.copy()
+            exec_globals.update(frames)
+            # Projections share the remaining columns' data with the loader
+            for name, columns in HIDDEN_COLUMNS.items():
+                if exec_globals[name] is not None:
+                    exec_globals[name] = exec_globals[name].drop(
+                        columns=columns, errors="ignore"
+                    )
+            self._exec_globals = (key, exec_globals)
+        return self._exec_globals[1]
+
     def format_result(self, execution_result: Dict[str, Any]) -> str:
         """Format execution result for LLM to analyze"""
 
@@ -264,21 +485,26 @@ Generate pandas code to answer this question using the available dataframes."""
 
         result = execution_result["result"]
 
+        if isinstance(result, (pd.DataFrame, pd.Series)) and len(result) == 0:
+            return "(empty result)"
+
         # Format based on result type
         if isinstance(result, pd.DataFrame):
+            # Wide frames are elided past 20 columns; the LLM only needs a
+            # bounded sample, not every cell
             if len(result) > 20:
                 formatted = f"DataFrame with {len(result)} rows and {len(result.columns)} columns\n\n"
                 formatted += "First 10 rows:\n"
-                formatted += result.head(10).to_string()
+                formatted += result.iloc[:10].to_string(max_cols=20, max_colwidth=40)
                 formatted += f"\n\n... (showing 10 of {len(result)} rows)"
             else:
-                formatted = result.to_string()
+                formatted = result.to_string(max_cols=20, max_colwidth=40)
 
         elif isinstance(result, pd.Series):
             if len(result) > 20:
                 formatted = f"Series with {len(result)} values\n\n"
                 formatted += "First 10 values:\n"
-                formatted += result.head(10).to_string()
+                formatted += result.iloc[:10].to_string()
                 formatted += f"\n\n... (showing 10 of {len(result)} values)"
             else:
                 formatted = result.to_string()
@@ -300,17 +526,9 @@ Generate pandas code to answer this question using the available dataframes."""
         """Have LLM analyze the execution results and provide insights"""
 
         formatted_result = self.format_result(execution_result)
-
-        system_prompt = """You are a retail analytics expert. Analyze data query results and provide clear insights for C-suite executives.
-
-**Your Response Should Include:**
-1. Direct answer to the question
-2. Key insights and patterns
-3. Specific numbers and percentages
-4. Business implications
-5. Recommendations (if applicable)
-
-Be concise, data-driven, and executive-friendly."""
+        cached = self._analysis_cache.get(question, formatted_result)
+        if cached is not None:
+            return cached
 
         user_message = f"""Original Question: {question}
 
@@ -325,11 +543,14 @@ Results:
 Provide a clear analysis and answer."""
 
         messages = [
-            {"role": "system", "content": system_prompt},
+            self._analysis_system_message,
             {"role": "user", "content": user_message},
         ]
 
         response = self.llm.chat_completion(messages, temperature=0.3, max_tokens=1000)
+        # Only real analyses are cached, so a failed call is retried next time
+        if not is_backend_error(response):
+            self._analysis_cache.put(question, response, formatted_result)
 
         return response
 
@@ -342,7 +563,8 @@ Provide a clear analysis and answer."""
             Tuple of (analysis_text, plotly_figure)
         """
 
-        # Get data context
+        # Encode the question for the semantic cache while the context is built
+        self._code_cache.prefetch(question)
         data_context = self._build_data_context()
 
         # Generate pandas code
@@ -353,6 +575,8 @@ Provide a clear analysis and answer."""
 
         # If execution failed, return error
         if not execution_result["success"]:
+            # Don't serve the broken code again for this question
+            self._code_cache.discard(question, data_context)
             error_msg = f"""**Code Generation Approach**
 
 I generated pandas code to answer your question, but execution failed:
@@ -368,11 +592,14 @@ I generated pandas code to answer your question, but execution failed:
 Let me try a different approach or please rephrase your question."""
             return (error_msg, None)
 
-        # Analyze results
-        analysis = self.analyze_results(question, execution_result)
-
-        # Generate visualization
-        viz = self.create_visualization(question, execution_result)
+        # Both steps only read the result, so the chart is built while the
+        # analysis request is waiting on the LLM
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            analysis_future = executor.submit(
+                self.analyze_results, question, execution_result
+            )
+            viz = self.create_visualization(question, execution_result)
+            analysis = analysis_future.result()
 
         # Return analysis and metadata separately for better UI rendering
         response = {
@@ -403,14 +630,20 @@ Let me try a different approach or please rephrase your question."""
                 df = result.reset_index()
                 df.columns = ["Category", "Value"]
             else:
-                df = result.copy()
+                # Only read below, so the caller's frame is used as is
+                df = result
 
             # Skip if result is too small or empty
             if len(df) == 0:
                 return None
 
-            # Determine visualization type based on data structure
-            numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
+            # Determine visualization type based on data structure: split the
+            # columns into numeric and category columns in one pass over dtypes
+            # (same set as select_dtypes("number"): timedeltas in, bool out)
+            numeric_cols = []
+            cat_cols = []
+            for col, dtype in df.dtypes.items():
+                (numeric_cols if dtype.kind in "iufcm" else cat_cols).append(col)
 
             if len(numeric_cols) == 0:
                 return None
@@ -420,7 +653,6 @@ Let me try a different approach or please rephrase your question."""
                 value_col = numeric_cols[0]
 
                 # Get categorical column (first non-numeric)
-                cat_cols = [c for c in df.columns if c not in numeric_cols]
                 if cat_cols:
                     cat_col = cat_cols[0]
 
@@ -430,55 +662,74 @@ Let me try a different approach or please rephrase your question."""
                     else:
                         df_plot = df
 
-                    fig = px.bar(
-                        df_plot,
-                        x=cat_col,
-                        y=value_col,
-                        title=f"{value_col} by {cat_col}",
-                        labels={value_col: value_col.replace("_", " ").title()},
-                        color=value_col,
-                        color_continuous_scale="Blues",
+                    values = df_plot[value_col].to_numpy(np.float64, na_value=np.nan)
+                    value_label = value_col.replace("_", " ").title()
+                    return _figure(
+                        [
+                            {
+                                "type": "bar",
+                                "x": df_plot[cat_col].to_numpy(),
+                                "y": values,
+                                "marker": {
+                                    "color": values,
+                                    "colorscale": "Blues",
+                                    "showscale": True,
+                                    "colorbar": {"title": {"text": value_label}},
+                                },
+                            }
+                        ],
+                        {
+                            "title": {"text": f"{value_col} by {cat_col}"},
+                            "xaxis": {"title": {"text": cat_col}, "tickangle": -45},
+                            "yaxis": {"title": {"text": value_label}},
+                        },
                     )
-                    fig.update_layout(height=400, xaxis_tickangle=-45)
-                    return fig
 
             # Case 2: Multiple numeric columns - grouped bar chart or line chart
             elif len(numeric_cols) >= 2:
-                cat_cols = [c for c in df.columns if c not in numeric_cols]
-
                 if cat_cols:
                     cat_col = cat_cols[0]
 
                     # Limit data
                     if len(df) > 15:
-                        # Sum numeric columns and take top entries
-                        df["_total"] = df[numeric_cols].sum(axis=1)
-                        df_plot = df.nlargest(15, "_total").drop("_total", axis=1)
+                        # Sum numeric columns and take top entries by position
+                        totals = df[numeric_cols].sum(axis=1).reset_index(drop=True)
+                        df_plot = df.iloc[totals.nlargest(15).index]
                     else:
                         df_plot = df
 
+                    x = df_plot[cat_col].to_numpy()
+                    cat_label = cat_col.replace("_", " ").title()
+                    layout = {
+                        "xaxis": {"title": {"text": cat_col}, "tickangle": -45},
+                        "yaxis": {"title": {"text": "value"}},
+                        "legend": {"title": {"text": "variable"}},
+                    }
+
                     # Check if we should use line chart (time series) or bar chart
                     if "date" in cat_col.lower() or "time" in cat_col.lower():
-                        # Line chart for time series
-                        fig = px.line(
-                            df_plot,
-                            x=cat_col,
-                            y=numeric_cols,
-                            title=f"Trend Analysis",
-                            labels={cat_col: cat_col.replace("_", " ").title()},
-                        )
+                        # Line chart for time series, one trace per measure
+                        trace = {"type": "scatter", "mode": "lines"}
+                        layout["title"] = {"text": "Trend Analysis"}
+                        layout["xaxis"]["title"]["text"] = cat_label
                     else:
                         # Grouped bar chart
-                        fig = px.bar(
-                            df_plot,
-                            x=cat_col,
-                            y=numeric_cols,
-                            title=f"Comparison Across {cat_col.replace('_', ' ').title()}",
-                            barmode="group",
-                        )
-
-                    fig.update_layout(height=400, xaxis_tickangle=-45)
-                    return fig
+                        trace = {"type": "bar"}
+                        layout["title"] = {"text": f"Comparison Across {cat_label}"}
+                        layout["barmode"] = "group"
+
+                    return _figure(
+                        [
+                            {
+                                **trace,
+                                "name": col,
+                                "x": x,
+                                "y": df_plot[col].to_numpy(np.float64, na_value=np.nan),
+                            }
+                            for col in numeric_cols
+                        ],
+                        layout,
+                    )
                 else:
                     # No categorical column - use index
                     if len(numeric_cols) == 2:
@@ -490,7 +741,7 @@ Let me try a different approach or please rephrase your question."""
                             title=f"{numeric_cols[1]} vs {numeric_cols[0]}",
                             trendline="ols",
                         )
-                        fig.update_layout(height=400)
+                        fig.update_layout(BASE_LAYOUT)
                         return fig
 
             return None
@@ -501,18 +752,32 @@ Let me try a different approach or please rephrase your question."""
             return None
 
     def _build_data_context(self) -> str:
-        """Build minimal data context for code generation"""
+        """Build minimal data context for code generation
+
+        The date range comes from the loader's per-frame column bounds and
+        categorical regions from their categories, so no column is scanned
+        per query. The string is reused until a frame is replaced or changes
+        length.
+        """
+        if self._data_context_cache[0] == self.data_loader.fingerprint():
+            return self._data_context_cache[1]
+
         context = []
 
         if self.data_loader.store_transactions is not None:
             df = self.data_loader.store_transactions
+            first, last = self.data_loader.column_bounds("store_transactions", "Date")
             context.append(
-                f"store_transactions: {len(df)} rows, date range: {df['Date'].min()} to {df['Date'].max()}"
+                f"store_transactions: {len(df)} rows, date range: {first} to {last}"
             )
 
         if self.data_loader.product_sales is not None:
             df = self.data_loader.product_sales
-            regions = df["Region"].unique()
+            regions = (
+                df["Region"].cat.categories
+                if isinstance(df["Region"].dtype, pd.CategoricalDtype)
+                else df["Region"].unique()
+            )
             context.append(
                 f"product_sales: {len(df)} rows, regions: {', '.join(regions)}"
             )
@@ -525,4 +790,6 @@ Let me try a different approach or please rephrase your question."""
             df = self.data_loader.customer_data
             context.append(f"customer_data: {len(df)} transactions")
 
-        return "\n".join(context)
+        data_context = "\n".join(context)
+        self._data_context_cache = (self.data_loader.fingerprint(), data_context)
+        return data_context
@@ -1,56 +1,97 @@
+import importlib.util
 import os
-from typing import Any, Dict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
 
 import pandas as pd
 
+from response_cache import ResponseCache, question_key_terms
+
+# Cosine similarity above which a reworded question reuses a cached answer
+ANSWER_SIMILARITY_THRESHOLD = 0.92
+
+# Questions answered at once by query_many(); the server must also run
+# requests in parallel (e.g. OLLAMA_NUM_PARALLEL) for this to pay off
+QUERY_MANY_WORKERS = 4
+
+# Answer length budget per query type: decode time grows with every generated
+# token, and "what/how much" answers need far fewer than explanations
+MAX_TOKENS_BY_QUERY_TYPE = {
+    "performance": 500,
+    "comparison": 800,
+    "anomaly": 1500,
+    "drilldown": 1500,
+}
+DEFAULT_MAX_TOKENS = 1500
+
 try:
     from llamastack_handler import LlamaStackLLM
-    from llm_handler import DataContextBuilder, QueryPromptBuilder
+except ImportError:
+    LlamaStackLLM = None
+
+try:
+    from llm_handler import (
+        LLM_UNREACHABLE_ERRORS,
+        QUERY_TYPE_PROMPT_BUILDERS,
+        QUERY_TYPE_SYSTEM_PROMPTS,
+        DataContextBuilder,
+        QueryPromptBuilder,
+        is_backend_error,
+    )
     from pandas_query_generator import PandasCodeGenerator
 
     LLM_HANDLER_AVAILABLE = True
 except ImportError:
     LLM_HANDLER_AVAILABLE = False
-    LlamaStackLLM = None
+    # Errors meaning the LLM server could not be reached
+    LLM_UNREACHABLE_ERRORS = (ConnectionError, TimeoutError)
     QueryPromptBuilder = None
     DataContextBuilder = None
+    QUERY_TYPE_SYSTEM_PROMPTS = None
+    QUERY_TYPE_PROMPT_BUILDERS = None
     PandasCodeGenerator = None
-    PandasCodeGenerator = None
-    PandasCodeGenerator = None
+    is_backend_error = None
 
-try:
-    from langchain_experimental.agents import create_pandas_dataframe_agent
-    from langchain_experimental.agents.agent_toolkits import create_python_agent
-    from langchain_experimental.tools.python.tool import PythonREPLTool
-
-    LANGCHAIN_AVAILABLE = True
-except ImportError:
-    LANGCHAIN_AVAILABLE = False
-    create_pandas_dataframe_agent = None
-    create_python_agent = None
-    PythonREPLTool = None
+# Only setup_agent() needs langchain_experimental; check for it without paying
+# its import cost on every page that imports this module
+LANGCHAIN_AVAILABLE = importlib.util.find_spec("langchain_experimental") is not None
 
 
 class QueryAgent:
-    def __init__(self, data_loader, llm=None, use_llamastack=True):
+    def __init__(self, data_loader, llm=None, use_llamastack=True, llm_backend=None):
+        """llm_backend replaces the default LlamaStackLLM, e.g. in tests"""
         self.data_loader = data_loader
         self.llm = llm
         self.agent = None
         self.use_llamastack = use_llamastack
 
-        if use_llamastack and LLM_HANDLER_AVAILABLE:
-            self.llm_backend = LlamaStackLLM()
+        use_llamastack = use_llamastack and LLM_HANDLER_AVAILABLE
+        if use_llamastack and llm_backend is None and LlamaStackLLM is not None:
+            llm_backend = LlamaStackLLM()
+
+        if use_llamastack and llm_backend is not None:
+            self.llm_backend = llm_backend
             self.prompt_builder = QueryPromptBuilder()
             self.context_builder = DataContextBuilder(data_loader)
             self.code_generator = PandasCodeGenerator(self.llm_backend, data_loader)
             self.llm_available = self.llm_backend.is_available()
             self.use_code_generation = True  # Enable dynamic code generation
+            # Code-generation answers (text, figure) for near-duplicate
+            # questions; scoped to the query type and data version
+            self._answer_cache = ResponseCache(
+                similarity_threshold=ANSWER_SIMILARITY_THRESHOLD,
+                key_terms=self._question_key_terms,
+            )
         else:
             self.llm_backend = None
             self.code_generator = None
             self.llm_available = False
             self.use_code_generation = False
 
+    def _question_key_terms(self, question: str) -> frozenset:
+        """Terms two questions must share to reuse a cached answer"""
+        return question_key_terms(question, self.data_loader.entity_names)
+
     def setup_agent(self):
         if not LANGCHAIN_AVAILABLE:
             print("Info: LangChain not installed. Using fallback query methods.")
@@ -62,6 +103,8 @@ class QueryAgent:
             )
             return
 
+        from langchain_experimental.agents import create_pandas_dataframe_agent
+
         all_data = self.data_loader.load_all_data()
 
         try:
@@ -74,9 +117,18 @@ class QueryAgent:
         except Exception as e:
             print(f"Error setting up agent: {e}")
 
-    def query(self, question: str, use_code_gen: bool = None):
+    def query(
+        self,
+        question: str,
+        use_code_gen: bool = None,
+        use_history: bool = True,
+        on_token: Optional[Callable[[str], None]] = None,
+    ):
         """Query the data and return (text_response, visualization_figure)
 
+        If on_token is given, one-off text answers (use_history=False) are
+        streamed: it is called with each text delta as the model produces it.
+
         Returns:
             Tuple of (str, Optional[plotly.graph_objects.Figure])
         """
@@ -93,38 +145,78 @@ class QueryAgent:
 
         # Try code generation approach if enabled
         if use_code_gen and self.code_generator:
+            # Only this path is cached: it is stateless, while text answers
+            # depend on the conversation history. The question is encoded in
+            # the background while the cache scope is worked out.
+            self._answer_cache.prefetch(question)
+            cache_context = "|".join(
+                (
+                    self.prompt_builder.classify_query(question),
+                    self.data_loader.data_version(),
+                )
+            )
+            cached = self._answer_cache.get(question, cache_context)
+            if cached is not None:
+                return cached
+
             try:
-                return self.code_generator.query_with_code_generation(question)
-            except Exception as e:
+                answer = self.code_generator.query_with_code_generation(question)
+            except LLM_UNREACHABLE_ERRORS as e:
+                # Skip the text-based retry: it would wait on the same server,
+                # so answer from the data summary instead
+                return (
+                    f"Error with LLM query: {str(e)}\n\nFalling back to simple "
+                    f"analysis...\n\n{self._fallback_query(question)}",
+                    None,
+                )
+            except Exception:
                 # Fallback to text-based LLM approach if code gen fails
-                return (self._query_with_llm(question), None)
+                return (self._query_with_llm(question, use_history, on_token), None)
+
+            # Failed runs come back as a plain error string, and a failed
+            # analysis as backend error text; only fully answered runs are kept
+            if isinstance(answer[0], dict) and not is_backend_error(
+                answer[0]["analysis"]
+            ):
+                self._answer_cache.put(question, answer, cache_context)
+            return answer
         else:
             # Use text-based LLM approach
-            return (self._query_with_llm(question), None)
+            return (self._query_with_llm(question, use_history, on_token), None)
+
+    def query_many(self, questions: List[str], use_code_gen: bool = None) -> List:
+        """Answer independent questions concurrently, in question order
+
+        Each answer is network-bound on the LLM server, so wall time tracks
+        the slowest question rather than the sum. Text answers are one-off
+        (no conversation history), since concurrent turns cannot share it.
+        """
+        if not questions:
+            return []
 
-    def _query_with_llm(self, question: str, use_history: bool = True) -> str:
+        workers = min(QUERY_MANY_WORKERS, len(questions))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(
+                    lambda q: self.query(q, use_code_gen, use_history=False),
+                    questions,
+                )
+            )
+
+    def _query_with_llm(
+        self,
+        question: str,
+        use_history: bool = True,
+        on_token: Optional[Callable[[str], None]] = None,
+    ) -> str:
         try:
             query_type = self.prompt_builder.classify_query(question)
+            max_tokens = MAX_TOKENS_BY_QUERY_TYPE.get(query_type, DEFAULT_MAX_TOKENS)
             data_summary = self.context_builder.build_data_summary(query_type)
 
             # Build system message based on query type
-            if query_type == "performance":
-                system_message = """You are analyzing performance metrics for a retail chain.
-Focus on: revenue trends, sales volumes, transaction counts, growth rates.
-Provide specific numbers, percentages, and clear comparisons."""
-            elif query_type == "comparison":
-                system_message = """You are comparing business metrics across different dimensions.
-Focus on: period-over-period comparisons, regional differences, product category comparisons.
-Highlight significant differences and provide context."""
-            elif query_type == "anomaly":
-                system_message = """You are identifying and explaining anomalies in retail business data.
-Focus on: outliers, unusual patterns, underperformance, overperformance.
-Provide statistical context (standard deviations, percentiles) when relevant."""
-            elif query_type == "drilldown":
-                system_message = """You are conducting a deep-dive analysis to understand root causes.
-Focus on: cost drivers, revenue components, operational factors.
-Break down complex metrics into understandable components."""
-            else:
+            system_message = QUERY_TYPE_SYSTEM_PROMPTS.get(query_type)
+            if system_message is None:
                 data_context = self.context_builder.build_context()
                 system_message = self.prompt_builder.build_system_prompt(data_context)
 
@@ -135,30 +227,17 @@ Break down complex metrics into understandable components."""
                     f"Question: {question}\n\nAvailable Data Summary:\n{data_summary}"
                 )
 
-                response = self.llm_backend.chat_with_history(
+                response = self.llm_backend.send_message(
                     user_message=user_message,
                     system_message=system_message,
                     temperature=0.3,
-                    max_tokens=1500,
+                    max_tokens=max_tokens,
                 )
             else:
                 # One-off query without history
-                if query_type == "performance":
-                    messages = self.prompt_builder.build_performance_query_prompt(
-                        question, data_summary
-                    )
-                elif query_type == "comparison":
-                    messages = self.prompt_builder.build_comparison_query_prompt(
-                        question, data_summary
-                    )
-                elif query_type == "anomaly":
-                    messages = self.prompt_builder.build_anomaly_query_prompt(
-                        question, data_summary
-                    )
-                elif query_type == "drilldown":
-                    messages = self.prompt_builder.build_drilldown_query_prompt(
-                        question, data_summary
-                    )
+                build_messages = QUERY_TYPE_PROMPT_BUILDERS.get(query_type)
+                if build_messages is not None:
+                    messages = build_messages(question, data_summary)
                 else:
                     messages = [
                         {"role": "system", "content": system_message},
@@ -168,15 +247,33 @@ Break down complex metrics into understandable components."""
                         },
                     ]
 
-                response = self.llm_backend.chat_completion(
-                    messages, temperature=0.3, max_tokens=1500
-                )
+                if on_token is not None:
+                    parts = []
+                    for delta in self.llm_backend.stream_completion(
+                        messages, temperature=0.3, max_tokens=max_tokens
+                    ):
+                        on_token(delta)
+                        parts.append(delta)
+                    response = "".join(parts)
+                else:
+                    response = self.llm_backend.chat_completion(
+                        messages, temperature=0.3, max_tokens=max_tokens
+                    )
 
             return f"**Query Type:** {query_type.title()}\n\n{response}"
 
         except Exception as e:
             return f"Error with LLM query: {str(e)}\n\nFalling back to simple analysis...\n\n{self._fallback_query(question)}"
 
+    def _fallback_query(self, question: str) -> str:
+        """Answer with the pandas-only data summary, without calling the LLM"""
+        try:
+            query_type = self.prompt_builder.classify_query(question)
+            summary = self.context_builder.build_data_summary(query_type)
+        except Exception as e:
+            return f"Unable to summarize the data: {str(e)}"
+        return f"**Data Summary:**\n\n{summary}"
+
     def clear_conversation(self):
         """Clear conversation history"""
         if self.llm_backend:
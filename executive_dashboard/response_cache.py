@@ -0,0 +1,308 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Collection, Dict, Hashable, Optional
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+
+    SENTENCE_TRANSFORMERS_AVAILABLE = True
+except ImportError:
+    SENTENCE_TRANSFORMERS_AVAILABLE = False
+    SentenceTransformer = None
+
+# Small local model used to match near-duplicate questions
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Max entries kept per cache before the least recently used one is evicted
+RESPONSE_CACHE_SIZE = 256
+
+# Question embeddings remembered across caches, so the answer, code and
+# analysis caches encode a question once between them
+EMBEDDING_MEMO_SIZE = 1024
+
+# (embedder or model name, normalized question) -> Future of its embedding
+_embedding_memo: "OrderedDict[tuple, Future]" = OrderedDict()
+_embedding_memo_lock = threading.Lock()
+
+# Runs model loads and prefetch() encodes; shared so no thread is started
+# per query
+_embed_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="embed")
+
+# Model name -> Future of its shared encoder
+_embedders: Dict[str, Future] = {}
+_embedders_lock = threading.Lock()
+
+
+def _load_embedder(model_name: str):
+    """Shared SentenceTransformer encoder, or None if it cannot be loaded"""
+    if not SENTENCE_TRANSFORMERS_AVAILABLE:
+        return None
+    try:
+        model = SentenceTransformer(model_name)
+    except Exception as e:
+        print(f"Semantic response cache disabled ({model_name}): {e}")
+        return None
+    return lambda text: model.encode(text, normalize_embeddings=True)
+
+
+def _embedder_future(model_name: str) -> Future:
+    """Shared encoder for a model, loaded once on _embed_executor"""
+    with _embedders_lock:
+        future = _embedders.get(model_name)
+        if future is None:
+            future = _embed_executor.submit(_load_embedder, model_name)
+            _embedders[model_name] = future
+    return future
+
+
+def _encode(embedder: Callable, question: str) -> Optional[np.ndarray]:
+    embedding = embedder(question)
+    if embedding is None:
+        return None
+    return np.asarray(embedding, dtype=np.float32)
+
+
+def normalize_question(question: str) -> str:
+    """Lowercased question with whitespace collapsed, shared by the caches"""
+    return " ".join(question.lower().split())
+
+
+# Words that pin a question to a period: a semantic hit must agree on them
+PERIOD_WORDS = frozenset(
+    "q1 q2 q3 q4 h1 h2 ytd qtd mtd first second third fourth last this next "
+    "previous prior current day daily week weekly month monthly quarter "
+    "quarterly year yearly annual january february march april may june july "
+    "august september october november december jan feb mar apr jun jul aug "
+    "sep sept oct nov dec".split()
+)
+# Longest entity name, in words, matched by question_key_terms
+ENTITY_MAX_WORDS = 3
+
+_WORD = re.compile(r"[a-z0-9]+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def question_key_terms(question: str, entity_names: Collection[str] = ()) -> frozenset:
+    """Numbers, period words and known entity names mentioned in a question
+
+    Embeddings place "East region revenue" next to "West region revenue",
+    so two questions only share a semantic hit when these terms agree.
+    entity_names are lowercased names such as regions, StoreIDs or products.
+    """
+    question = question.lower()
+    words = _WORD.findall(question)
+    terms = set(_NUMBER.findall(question))
+    terms.update(word for word in words if word in PERIOD_WORDS)
+    if entity_names:
+        for n in range(1, ENTITY_MAX_WORDS + 1):
+            for i in range(len(words) - n + 1):
+                name = " ".join(words[i : i + n])
+                if name in entity_names:
+                    terms.add(name)
+    return frozenset(terms)
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.sha1(text.encode("utf-8")).digest()
+
+
+class ResponseCache:
+    """LRU cache of LLM responses with exact and semantic lookup tiers
+
+    Entries are keyed on (normalized question, context). A lookup first tries the exact
+    key; on a miss the question embedding is compared against every cached
+    question with the same context in a single matrix-vector product, and the
+    best match is returned if its cosine similarity reaches the threshold
+    and key_terms() gives the same result for both questions.
+    The semantic tier is skipped when no embedder is available or the
+    embedder returns None.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = RESPONSE_CACHE_SIZE,
+        similarity_threshold: float = 0.95,
+        embedder: Optional[Callable[[str], np.ndarray]] = None,
+        embedding_model: str = DEFAULT_EMBEDDING_MODEL,
+        key_terms: Callable[[str], Hashable] = question_key_terms,
+    ):
+        self.maxsize = maxsize
+        self.similarity_threshold = similarity_threshold
+        self.key_terms = key_terms
+        self._embedder = embedder
+        # Embedding memo key: the embedder itself, or the shared model's name
+        self._embedder_key = embedding_model if embedder is None else embedder
+        # Start loading the model off the caller's thread; tasks that need it
+        # are submitted to the same executor after this one
+        self._embedder_loading = (
+            _embedder_future(embedding_model) if embedder is None else None
+        )
+
+        # Exact key -> slot index; order tracks recency for LRU eviction
+        self._slots: "OrderedDict[bytes, int]" = OrderedDict()
+        self._slot_keys = [None] * maxsize
+        self._values = [None] * maxsize
+        # Row i holds the normalized question embedding of slot i (zeros when
+        # unused), _slot_contexts[i] its context digest and _slot_questions[i]
+        # its normalized question
+        self._embeddings = None
+        self._slot_contexts = [None] * maxsize
+        self._slot_questions = [None] * maxsize
+        self._lock = threading.Lock()
+
+    def _encode_question(self, question: str) -> Optional[np.ndarray]:
+        """Embedding of a normalized question, waiting for the model if loading"""
+        if self._embedder is None:
+            self._embedder = self._embedder_loading.result() or False
+        if not self._embedder:
+            return None
+        return _encode(self._embedder, question)
+
+    def _embedding_future(self, question: str, background: bool) -> Optional[Future]:
+        """Memoized embedding of a normalized question, started if not yet known"""
+        if self._embedder is False:
+            return None
+
+        key = (self._embedder_key, question)
+        with _embedding_memo_lock:
+            future = _embedding_memo.get(key)
+            if future is not None:
+                _embedding_memo.move_to_end(key)
+                return future
+            if background:
+                future = _embed_executor.submit(self._encode_question, question)
+            else:
+                future = Future()
+            _embedding_memo[key] = future
+            if len(_embedding_memo) > EMBEDDING_MEMO_SIZE:
+                _embedding_memo.popitem(last=False)
+
+        if not background:
+            try:
+                future.set_result(self._encode_question(question))
+            except Exception as e:
+                future.set_exception(e)
+        return future
+
+    def _embed(self, question: str) -> Optional[np.ndarray]:
+        future = self._embedding_future(question, background=False)
+        if future is None:
+            return None
+        try:
+            return future.result()
+        except Exception:
+            # Forget the failure so a later lookup encodes again
+            with _embedding_memo_lock:
+                _embedding_memo.pop((self._embedder_key, question), None)
+            raise
+
+    def prefetch(self, question: str) -> None:
+        """Start encoding the question in the background
+
+        Lets the caller overlap the embedding with other work (e.g. building
+        the data context) before get()/put() need it.
+        """
+        self._embedding_future(normalize_question(question), background=True)
+
+    def get(self, question: str, context: str = "") -> Optional[Any]:
+        """Cached response for the question under this context, or None"""
+        question = normalize_question(question)
+        context_key = _digest(context)
+        key = _digest(question + "\0" + context)
+
+        with self._lock:
+            slot = self._slots.get(key)
+            if slot is not None:
+                self._slots.move_to_end(key)
+                return self._values[slot]
+            if self._embeddings is None:
+                return None
+
+        query = self._embed(question)
+        if query is None:
+            return None
+
+        terms = self.key_terms(question)
+        with self._lock:
+            scores = self._embeddings @ query
+            for slot in np.argsort(-scores):
+                if scores[slot] < self.similarity_threshold:
+                    break
+                if (
+                    self._slot_contexts[slot] == context_key
+                    and self.key_terms(self._slot_questions[slot]) == terms
+                ):
+                    self._slots.move_to_end(self._slot_keys[slot])
+                    return self._values[slot]
+        return None
+
+    def put(self, question: str, value: Any, context: str = "") -> None:
+        question = normalize_question(question)
+        key = _digest(question + "\0" + context)
+        embedding = self._embed(question)
+
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                if len(self._slots) < self.maxsize:
+                    slot = len(self._slots)
+                else:
+                    _, slot = self._slots.popitem(last=False)
+            self._slots[key] = slot
+            self._slot_keys[slot] = key
+            self._values[slot] = value
+            self._slot_contexts[slot] = _digest(context)
+            self._slot_questions[slot] = question
+
+            if embedding is not None:
+                if self._embeddings is None:
+                    self._embeddings = np.zeros(
+                        (self.maxsize, embedding.shape[0]), dtype=np.float32
+                    )
+                self._embeddings[slot] = embedding
+            elif self._embeddings is not None:
+                self._embeddings[slot] = 0
+
+    def discard(self, question: str, context: str = "") -> None:
+        """Drop an exact entry, e.g. generated code that failed to run"""
+        question = normalize_question(question)
+        key = _digest(question + "\0" + context)
+        with self._lock:
+            slot = self._slots.pop(key, None)
+            if slot is None:
+                return
+            # Move the last occupied slot into the freed one so occupied
+            # slots stay contiguous
+            last = len(self._slots)
+            if slot != last:
+                last_key = self._slot_keys[last]
+                self._slots[last_key] = slot
+                self._slot_keys[slot] = last_key
+                self._values[slot] = self._values[last]
+                self._slot_contexts[slot] = self._slot_contexts[last]
+                self._slot_questions[slot] = self._slot_questions[last]
+                if self._embeddings is not None:
+                    self._embeddings[slot] = self._embeddings[last]
+            self._slot_keys[last] = None
+            self._values[last] = None
+            self._slot_contexts[last] = None
+            self._slot_questions[last] = None
+            if self._embeddings is not None:
+                self._embeddings[last] = 0
+
+    def clear(self) -> None:
+        with self._lock:
+            self._slots.clear()
+            self._slot_keys = [None] * self.maxsize
+            self._values = [None] * self.maxsize
+            self._slot_contexts = [None] * self.maxsize
+            self._slot_questions = [None] * self.maxsize
+            self._embeddings = None
+
+    def __len__(self) -> int:
+        return len(self._slots)
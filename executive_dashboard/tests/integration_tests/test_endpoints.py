@@ -34,27 +34,25 @@ test_payload = {
 print("Testing Llama Stack endpoints...")
 print("=" * 60)
 
-for endpoint in endpoints:
-    url = f"{base_url}{endpoint}"
-    print(f"\nTesting: {url}")
-    try:
-        response = requests.post(
-            url,
-            json=test_payload,
-            headers={"Content-Type": "application/json"},
-            timeout=10,
-        )
-        if response.status_code == 200:
-            print(f"✅ SUCCESS! Status: {response.status_code}")
-            result = response.json()
-            if "choices" in result:
-                print(f"   Response: {result['choices'][0]['message']['content']}")
+# One keep-alive session so every endpoint after the first reuses the connection
+with requests.Session() as session:
+    session.headers.update({"Content-Type": "application/json"})
+    for endpoint in endpoints:
+        url = f"{base_url}{endpoint}"
+        print(f"\nTesting: {url}")
+        try:
+            response = session.post(url, json=test_payload, timeout=10)
+            if response.status_code == 200:
+                print(f"✅ SUCCESS! Status: {response.status_code}")
+                result = response.json()
+                if "choices" in result:
+                    print(f"   Response: {result['choices'][0]['message']['content']}")
+                else:
+                    print(f"   Response: {result}")
             else:
-                print(f"   Response: {result}")
-        else:
-            print(f"❌ Failed. Status: {response.status_code}")
-            print(f"   Response: {response.text[:200]}")
-    except Exception as e:
-        print(f"❌ Error: {e}")
+                print(f"❌ Failed. Status: {response.status_code}")
+                print(f"   Response: {response.text[:200]}")
+        except Exception as e:
+            print(f"❌ Error: {e}")
 
 print("\n" + "=" * 60)
@@ -0,0 +1,16 @@
+"""Shared helpers for the unit tests"""
+
+
+class ScriptedBackend:
+    """Stub LLM backend returning queued responses and counting calls"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def is_available(self):
+        return True
+
+    def chat_completion(self, messages, temperature=None, max_tokens=None):
+        self.calls += 1
+        return self.responses.pop(0)
@@ -4,16 +4,18 @@ These are true unit tests that don't require external services.
 They test basic functionality and data validation.
 """
 
+import os
 import sys
 from pathlib import Path
 
+import numpy as np
 import pandas as pd
 import pytest
 
 # Add parent directory to path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
-from data_loader import RetailDataLoader
+from data_loader import RetailDataLoader, _column_major, _optimize_dtypes
 
 
 class TestDataLoader:
@@ -43,6 +45,69 @@ class TestDataLoader:
         assert callable(loader.load_all_data)
 
 
+class TestParquetCache:
+    """Test the Parquet cache used to skip re-parsing Excel workbooks"""
+
+    def test_cache_written_and_reused(self, tmp_path):
+        """Test that a workbook is cached on first read and served from Parquet after"""
+        pytest.importorskip("pyarrow")
+        df = pd.DataFrame({"StoreID": ["S1", "S2"], "TotalPrice": [100.0, 200.0]})
+        df.to_excel(tmp_path / "Sample.xlsx", index=False)
+
+        loader = RetailDataLoader(data_dir=str(tmp_path))
+        first = loader._load_one("Sample.xlsx")
+        parquet_path = tmp_path / ".cache" / "Sample.parquet"
+        assert parquet_path.exists()
+
+        # An older workbook mtime means the cached Parquet copy is still fresh
+        os.utime(tmp_path / "Sample.xlsx", (0, 0))
+        second = loader._load_one("Sample.xlsx")
+        pd.testing.assert_frame_equal(first, second)
+
+    def test_failed_cache_write_does_not_break_loading(self, tmp_path):
+        """Test that a column pyarrow cannot convert still loads from the workbook"""
+        pytest.importorskip("pyarrow")
+        df = pd.DataFrame({"StoreID": ["S1", 2, "S3"], "TotalPrice": [1.0, 2.0, 3.0]})
+        df.to_excel(tmp_path / "Sample.xlsx", index=False)
+
+        loader = RetailDataLoader(data_dir=str(tmp_path))
+        loaded = loader._load_one("Sample.xlsx")
+
+        assert loaded["StoreID"].tolist() == ["S1", 2, "S3"]
+        assert not (tmp_path / ".cache" / "Sample.parquet").exists()
+
+
+class TestDtypeOptimization:
+    """Test dtype narrowing applied after loading"""
+
+    def test_optimize_dtypes(self):
+        """Test categorical conversion and int32 downcast"""
+        df = pd.DataFrame(
+            {
+                "StoreID": ["S1", "S2", "S1"],
+                "Quantity": [1, 2, 3],
+                "Note": ["a", "b", "c"],
+            }
+        )
+
+        _optimize_dtypes(df, cat_cols=["StoreID", "Missing"], int_cols=["Quantity"])
+
+        assert df["StoreID"].dtype == "category"
+        assert df["Quantity"].dtype == "int32"
+        assert df["Note"].dtype != "category"
+
+    def test_column_major_layout(self):
+        """Test that frames with strided columns are re-laid out once"""
+        strided = pd.DataFrame(
+            np.arange(12.0).reshape(4, 3), columns=["a", "b", "c"], copy=False
+        )
+        fixed = _column_major(strided)
+
+        assert all(b.values.flags["C_CONTIGUOUS"] for b in fixed._mgr.blocks)
+        pd.testing.assert_frame_equal(fixed, strided)
+        assert _column_major(fixed) is fixed
+
+
 class TestDataValidation:
     """Test data validation helper functions"""
 
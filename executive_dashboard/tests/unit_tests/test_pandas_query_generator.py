@@ -0,0 +1,102 @@
+"""Unit tests for pandas_query_generator module
+
+These are true unit tests that don't require an LLM backend.
+"""
+
+import ast
+import sys
+from pathlib import Path
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from conftest import ScriptedBackend
+from data_loader import RetailDataLoader
+from pandas_query_generator import (
+    PandasCodeGenerator,
+    _compile_generated,
+    _NumbaGroupbyEngine,
+)
+
+BACKEND_ERROR = "Error calling LlamaStack API: timed out"
+
+
+class TestNumbaGroupbyEngine:
+    """Test the AST pass that moves groupby reductions onto Numba"""
+
+    def test_only_groupby_reductions_rewritten(self):
+        """Test that groupby sum/mean get engine="numba" and other calls don't"""
+        source = (
+            "a = df.groupby('Region')['TotalPrice'].sum()\n"
+            "b = df['TotalPrice'].sum()\n"
+            "c = df.groupby('Region').agg({'TotalPrice': 'sum'})\n"
+            "d = df.groupby('Region').mean(engine='cython')\n"
+        )
+        transformer = _NumbaGroupbyEngine()
+        lines = ast.unparse(transformer.visit(ast.parse(source))).splitlines()
+
+        assert transformer.changed
+        assert "engine='numba'" in lines[0]
+        assert all("numba" not in line for line in lines[1:])
+
+
+class TestCodeValidation:
+    """Test the AST checks applied before generated code is compiled"""
+
+    @pytest.mark.parametrize(
+        "code",
+        [
+            "import os\nresult = 1",
+            "result = open('secrets.txt').read()",
+            "result = ().__class__.__subclasses__()",
+        ],
+    )
+    def test_unsafe_code_rejected(self, code):
+        """Test that imports, blocked builtins and dunder access are refused"""
+        with pytest.raises(ValueError):
+            _compile_generated(code)
+
+    def test_allowed_code_compiles(self):
+        """Test that pandas-only snippets, including allowed imports, compile"""
+        code = "import pandas as pd\nresult = pd.DataFrame({'a': [1]})"
+        namespace = {}
+        exec(_compile_generated(code), {}, namespace)
+        assert namespace["result"]["a"].tolist() == [1]
+
+
+class TestBackendErrors:
+    """Test that backend error text is never cached as an LLM response"""
+
+    def test_error_not_cached_as_code(self):
+        """Test that a failed generation raises and is retried next time"""
+        backend = ScriptedBackend([BACKEND_ERROR, "```python\nresult = 1\n```"])
+        generator = PandasCodeGenerator(backend, RetailDataLoader())
+
+        with pytest.raises(RuntimeError):
+            generator.generate_code("Total revenue?", "ctx")
+        assert generator.generate_code("Total revenue?", "ctx") == "result = 1"
+        assert backend.calls == 2
+
+    def test_error_not_cached_as_analysis(self):
+        """Test that a failed analysis is returned but not served from cache"""
+        backend = ScriptedBackend([BACKEND_ERROR, "Revenue is 1."])
+        generator = PandasCodeGenerator(backend, RetailDataLoader())
+        execution_result = {
+            "success": True,
+            "result": 1,
+            "code": "result = 1",
+            "result_type": "int",
+        }
+
+        answers = [
+            generator.analyze_results("Revenue?", execution_result) for _ in range(3)
+        ]
+
+        assert answers == [BACKEND_ERROR, "Revenue is 1.", "Revenue is 1."]
+        assert backend.calls == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
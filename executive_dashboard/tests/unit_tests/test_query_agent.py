@@ -0,0 +1,108 @@
+"""Unit tests for query_agent module
+
+These are true unit tests: the LLM backend is a local stub, not a server.
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+import requests
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+from conftest import ScriptedBackend
+from data_loader import RetailDataLoader
+from query_agent import LLM_HANDLER_AVAILABLE, QueryAgent
+
+pytestmark = pytest.mark.skipif(
+    not LLM_HANDLER_AVAILABLE, reason="query_agent LLM helpers not importable"
+)
+
+
+class UnreachableBackend:
+    """Stub LLM backend whose server refuses every connection"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def is_available(self):
+        return True
+
+    def chat_completion(self, messages, temperature=None, max_tokens=None):
+        self.calls += 1
+        raise requests.ConnectionError("Connection refused")
+
+
+@pytest.fixture
+def loader():
+    """Loader holding a tiny in-memory store_transactions frame"""
+    loader = RetailDataLoader()
+    loader.store_transactions = pd.DataFrame(
+        {
+            "Date": pd.to_datetime(["2025-01-01", "2025-01-02", "2025-01-03"]),
+            "StoreID": ["S1", "S2", "S1"],
+            "Product": ["A", "B", "A"],
+            "Quantity": [1, 2, 3],
+            "TotalPrice": [10.0, 20.0, 30.0],
+        }
+    )
+    return loader
+
+
+class TestUnreachableBackend:
+    """Test the answer path when the LLM server cannot be reached"""
+
+    def test_code_generation_falls_back_to_data_summary(self, loader):
+        """Test that a connection error skips the text retry and uses the data"""
+        backend = UnreachableBackend()
+        agent = QueryAgent(loader, llm_backend=backend)
+
+        answer, viz = agent.query("Which store has the highest revenue?")
+
+        assert "**Data Summary:**" in answer
+        assert "Total Revenue: $60.00" in answer
+        assert viz is None
+        assert backend.calls == 1
+
+
+class TestAnswerCache:
+    """Test which code-generation answers QueryAgent keeps"""
+
+    def test_failed_analysis_not_cached(self, loader):
+        """Test that an answer whose analysis failed is recomputed"""
+        backend = ScriptedBackend(
+            [
+                "```python\nresult = store_transactions['TotalPrice'].sum()\n```",
+                "Error calling LlamaStack API: timed out",
+                "Revenue is $60.",
+            ]
+        )
+        agent = QueryAgent(loader, llm_backend=backend)
+
+        analyses = [
+            agent.query("What is the total revenue?")[0]["analysis"] for _ in range(3)
+        ]
+
+        assert analyses[0].startswith("Error calling LlamaStack API")
+        assert analyses[1:] == ["Revenue is $60.", "Revenue is $60."]
+        # The code is reused; only the failed analysis is asked for again
+        assert backend.calls == 3
+
+    def test_similar_question_about_other_store_misses(self, loader):
+        """Test that a cached answer is not reused for a different StoreID"""
+        agent = QueryAgent(loader, llm_backend=ScriptedBackend([]))
+        cache = agent._answer_cache
+        # Every question embeds identically, so only the key terms differ
+        cache._embedder = lambda text: np.full(4, 0.5, dtype=np.float32)
+        cache.put("Revenue for store S1", "answer-s1", "ctx")
+
+        assert cache.get("What was the revenue for store S1?", "ctx") == "answer-s1"
+        assert cache.get("Revenue for store S2", "ctx") is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
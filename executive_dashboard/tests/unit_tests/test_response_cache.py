@@ -0,0 +1,134 @@
+"""Unit tests for response_cache module
+
+These are true unit tests that don't require an LLM or an embedding model.
+"""
+
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+
+import response_cache
+from response_cache import ResponseCache, question_key_terms
+
+
+def _bag_of_words(text):
+    """Tiny deterministic embedder: normalized counts over a fixed vocabulary"""
+    vocab = ["revenue", "store", "region", "cost", "top", "margin"]
+    words = text.lower().replace("?", "").split()
+    vec = np.array([words.count(w) for w in vocab], dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class TestExactTier:
+    """Test exact (question, context) lookups without an embedder"""
+
+    def test_hit_miss_and_context(self):
+        """Test that entries are keyed on both question and context"""
+        cache = ResponseCache(embedder=lambda text: None)
+        cache.put("Top stores?", "code-a", context="ctx-1")
+
+        assert cache.get("Top stores?", context="ctx-1") == "code-a"
+        assert cache.get("Top stores?", context="ctx-2") is None
+        assert cache.get("Top regions?", context="ctx-1") is None
+
+    def test_questions_normalized(self):
+        """Test that case and whitespace differences hit the same entry"""
+        cache = ResponseCache(embedder=lambda text: None)
+        cache.put("Top stores?", "code-a")
+
+        assert cache.get("  top   STORES? ") == "code-a"
+        cache.discard("TOP stores?")
+        assert len(cache) == 0
+
+    def test_lru_eviction_and_discard(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = ResponseCache(maxsize=2, embedder=lambda text: None)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+
+        cache.discard("a")
+        assert len(cache) == 1
+        assert cache.get("c") == 3
+
+
+class TestSemanticTier:
+    """Test near-duplicate lookups through the embedding matrix"""
+
+    def test_similar_question_hits_within_same_context(self):
+        """Test that a reworded question reuses the cached response"""
+        cache = ResponseCache(embedder=_bag_of_words, similarity_threshold=0.9)
+        cache.put("Top store revenue", "code-a", context="ctx-1")
+        cache.put("Region cost margin", "code-b", context="ctx-1")
+
+        assert cache.get("top store revenue?", context="ctx-1") == "code-a"
+        assert cache.get("top store revenue?", context="ctx-2") is None
+        assert cache.get("store cost", context="ctx-1") is None
+
+    def test_hit_requires_same_numbers_periods_and_entities(self):
+        """Test that a similar question about another period or entity misses"""
+        cache = ResponseCache(
+            embedder=_bag_of_words,
+            key_terms=lambda q: question_key_terms(q, {"east", "west", "s1"}),
+        )
+        cache.put("Top store revenue in Q3 2024", "code-q3")
+        cache.put("East region revenue", "code-east")
+
+        assert cache.get("top store revenue for q3 2024?") == "code-q3"
+        assert cache.get("top store revenue in Q4 2024") is None
+        assert cache.get("top store revenue in Q3 2023") is None
+        assert cache.get("West region revenue") is None
+        assert cache.get("Top store S1 revenue in Q3 2024") is None
+
+    def test_prefetched_embedding_shared_across_caches(self):
+        """Test that a question is encoded once for every cache using the embedder"""
+        calls = []
+
+        def embedder(text):
+            calls.append(text)
+            return _bag_of_words(text)
+
+        answers = ResponseCache(embedder=embedder)
+        code = ResponseCache(embedder=embedder)
+        answers.prefetch("Top Store revenue")
+        code.put("top store revenue", "code-a")
+        answers.put("top store  revenue", "answer-a")
+
+        assert calls == ["top store revenue"]
+        assert code.get("Top store revenue?") == "code-a"
+        assert calls == ["top store revenue", "top store revenue?"]
+
+    def test_model_loads_off_the_calling_thread(self, monkeypatch):
+        """Test that prefetch() returns while the embedding model is still loading"""
+        loaded = threading.Event()
+        finished = []
+
+        def slow_load(model_name):
+            loaded.wait(timeout=5)
+            finished.append(model_name)
+            return _bag_of_words
+
+        monkeypatch.setattr(response_cache, "_load_embedder", slow_load)
+        cache = ResponseCache(embedding_model="test-slow-model")
+        cache.prefetch("Top store revenue")
+        assert finished == []
+
+        loaded.set()
+        cache.put("Top store revenue", "code-a")
+        assert cache.get("top store revenue?") == "code-a"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,26 +1,116 @@
+from functools import wraps
+
 import numpy as np
 import pandas as pd
-import plotly.express as px
 import plotly.graph_objects as go
+from plotly.colors import sequential
 from plotly.subplots import make_subplots
 
+try:
+    from numba import njit
+
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+# Daily series longer than this are summed to weekly totals before plotting
+RESAMPLE_THRESHOLD = 5000
+
+# Layout keys shared by every chart; per-chart layouts add titles and axes.
+# No transition animation: a chart is replaced, not morphed, on new data
+BASE_LAYOUT = {"transition": {"duration": 0}, "height": 400}
+KPI_LAYOUT = {**BASE_LAYOUT, "height": 500}
+
+# Right-closed stock level bins (0, 50], (50, 100], (100, 200], (200, inf)
+STOCK_EDGES = np.array([0, 50, 100, 200], dtype=np.float64)
+STOCK_LABELS = np.array(
+    ["Critical (0-50)", "Low (51-100)", "Medium (101-200)", "High (200+)"]
+)
+
+
+def _stock_counts(stock: np.ndarray, edges: np.ndarray) -> np.ndarray:
+    """Per-bin counts of right-closed bins; values <= edges[0] or NaN are dropped"""
+    stock = stock[~np.isnan(stock)]
+    bins = np.searchsorted(edges, stock, side="left")
+    return np.bincount(bins, minlength=len(edges) + 1)[1:]
+
+
+if NUMBA_AVAILABLE:
+
+    @njit(cache=True)
+    def _stock_counts(stock, edges):  # noqa: F811
+        # Same contract as the NumPy version in one pass, without the bin array
+        counts = np.zeros(len(edges) + 1, np.int64)
+        for i in range(stock.shape[0]):
+            if not np.isnan(stock[i]):
+                counts[np.searchsorted(edges, stock[i], side="left")] += 1
+        return counts[1:]
+
+
+def _is_empty(df) -> bool:
+    """True for a dataset that is missing or has no rows"""
+    return df is None or df.empty
+
+
+def _figure(data, layout):
+    """Build a Figure from plain trace/layout dicts
+
+    Bypasses plotly.express and the per-trace graph_objs constructors, whose
+    property validation dominates build time for charts rebuilt every rerun.
+    """
+    layout = {**BASE_LAYOUT, **layout}
+    return go.Figure({"data": data, "layout": layout}, skip_invalid=True)
+
+
+def _cached_chart(build):
+    """Memoize a chart method per instance until the loader's data changes
+
+    Keeps one (fingerprint, figure) entry per chart, so Streamlit reruns on
+    unchanged data reuse the built figure. Callers must not modify it.
+    """
+    name = build.__name__
+
+    @wraps(build)
+    def wrapper(self):
+        fingerprint = self.data_loader.fingerprint()
+        cached = self._chart_cache.get(name)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+
+        fig = build(self)
+        self._chart_cache[name] = (fingerprint, fig)
+        return fig
+
+    return wrapper
+
 
 class DashboardVisualizations:
     def __init__(self, data_loader, metrics_calculator):
         self.data_loader = data_loader
         self.metrics_calculator = metrics_calculator
+        # (frame identity/row count, date column or None) for the trend chart
+        self._date_col_cache = (None, None)
+        # Chart method name -> (loader fingerprint, figure or None)
+        self._chart_cache = {}
+
+    def _date_column(self, transactions: pd.DataFrame):
+        """First column whose name mentions a date, looked up once per frame"""
+        key = (id(transactions), len(transactions))
+        if self._date_col_cache[0] != key:
+            date_col = next(
+                (col for col in transactions.columns if "date" in col.lower()), None
+            )
+            self._date_col_cache = (key, date_col)
+        return self._date_col_cache[1]
 
+    @_cached_chart
     def create_revenue_trend_chart(self):
         transactions = self.data_loader.store_transactions
 
-        if transactions is None:
+        if _is_empty(transactions):
             return None
 
-        date_col = None
-        for col in transactions.columns:
-            if "date" in col.lower():
-                date_col = col
-                break
+        date_col = self._date_column(transactions)
 
         if date_col is None:
             daily_revenue = (
@@ -29,129 +119,178 @@ class DashboardVisualizations:
                 .reset_index()
             )
             daily_revenue.columns = ["Day", "Revenue"]
-            fig = px.line(
-                daily_revenue,
-                x="Day",
-                y="Revenue",
-                title="Revenue Trend Over Time",
-                labels={"Day": "Period", "Revenue": "Revenue ($)"},
-            )
+            if len(daily_revenue) > RESAMPLE_THRESHOLD:
+                # Seven consecutive periods per point, labelled by the first one
+                daily_revenue = daily_revenue.groupby(
+                    daily_revenue["Day"] // 7 * 7, as_index=False
+                )["Revenue"].sum()
+                daily_revenue.columns = ["Day", "Revenue"]
+            x, y = daily_revenue["Day"], daily_revenue["Revenue"]
+            x_title = "Period"
         else:
-            transactions[date_col] = pd.to_datetime(transactions[date_col])
-            daily_revenue = (
-                transactions.groupby(date_col)["TotalPrice"].sum().reset_index()
-            )
-            fig = px.line(
-                daily_revenue,
-                x=date_col,
-                y="TotalPrice",
-                title="Revenue Trend Over Time",
-                labels={date_col: "Date", "TotalPrice": "Revenue ($)"},
-            )
-
-        fig.update_layout(height=400)
-        return fig
+            if date_col == "Date":
+                # The loader's date-sorted view is built once per load, so the
+                # daily totals come from runs of an already sorted index
+                revenue = self.data_loader.store_transactions_by_date["TotalPrice"]
+                daily_revenue = revenue.groupby(level=0, sort=False).sum()
+            else:
+                # Parse into a local Series; the loader's frame is shared
+                dates = pd.to_datetime(transactions[date_col])
+                daily_revenue = transactions["TotalPrice"].groupby(dates).sum()
+            x_title = "Date"
+            if len(daily_revenue) > RESAMPLE_THRESHOLD:
+                # The figure is static once sent, so aggregate up front rather
+                # than shipping a downsampled view that never refines on zoom
+                daily_revenue = daily_revenue.resample("W").sum()
+                x_title = "Week"
+            x, y = daily_revenue.index, daily_revenue.to_numpy()
+
+        layout = {
+            "title": {"text": "Revenue Trend Over Time"},
+            "xaxis": {"title": {"text": x_title}},
+            "yaxis": {"title": {"text": "Revenue ($)"}},
+        }
+
+        return _figure(
+            # WebGL trace: daily points across several years render faster than SVG
+            [{"type": "scattergl", "mode": "lines", "x": x, "y": y}],
+            layout,
+        )
 
+    @_cached_chart
     def create_store_performance_chart(self):
+        # Skip the metrics aggregation when there is nothing to plot
+        if _is_empty(self.data_loader.store_transactions):
+            return None
+
         store_perf = self.metrics_calculator.get_store_performance()
 
         if store_perf.empty:
             return None
 
-        top_stores = store_perf.head(10)
-
-        fig = px.bar(
-            top_stores.reset_index(),
-            x="StoreID",
-            y="Total_Revenue",
-            title="Top 10 Stores by Revenue",
-            labels={"Total_Revenue": "Total Revenue ($)", "StoreID": "Store ID"},
-            color="Total_Revenue",
-            color_continuous_scale="Blues",
+        # Partial selection that does not depend on the calculator's row order
+        top_stores = store_perf.nlargest(10, "Total_Revenue")
+        revenue = top_stores["Total_Revenue"]
+
+        return _figure(
+            [
+                {
+                    "type": "bar",
+                    "x": top_stores.index.astype(str),
+                    "y": revenue,
+                    "marker": {
+                        "color": revenue,
+                        "colorscale": "Blues",
+                        "showscale": True,
+                        "colorbar": {"title": {"text": "Total Revenue ($)"}},
+                    },
+                }
+            ],
+            {
+                "title": {"text": "Top 10 Stores by Revenue"},
+                "xaxis": {"title": {"text": "Store ID"}},
+                "yaxis": {"title": {"text": "Total Revenue ($)"}},
+            },
         )
 
-        fig.update_layout(height=400)
-        return fig
-
+    @_cached_chart
     def create_regional_heatmap(self):
+        if _is_empty(self.data_loader.product_sales):
+            return None
+
         regional_perf = self.metrics_calculator.get_regional_performance()
 
         if regional_perf.empty:
             return None
 
-        fig = go.Figure(
-            data=go.Heatmap(
-                z=regional_perf[["TotalPrice", "TotalCost", "Profit"]].values.T,
-                x=regional_perf.index,
-                y=["Revenue", "Cost", "Profit"],
-                colorscale="RdYlGn",
-                text=regional_perf[["TotalPrice", "TotalCost", "Profit"]].values.T,
-                texttemplate="$%{text:,.0f}",
-                textfont={"size": 10},
-            )
+        # One metric-by-region array serves as both cell values and labels
+        z = np.ascontiguousarray(
+            regional_perf[["TotalPrice", "TotalCost", "Profit"]].to_numpy().T
         )
 
-        fig.update_layout(
-            title="Regional Performance Heatmap",
-            xaxis_title="Region",
-            yaxis_title="Metric",
-            height=400,
+        return _figure(
+            [
+                {
+                    "type": "heatmap",
+                    "z": z,
+                    "x": regional_perf.index.astype(str),
+                    "y": ["Revenue", "Cost", "Profit"],
+                    "colorscale": "RdYlGn",
+                    "text": z,
+                    "texttemplate": "$%{text:,.0f}",
+                    "textfont": {"size": 10},
+                }
+            ],
+            {
+                "title": {"text": "Regional Performance Heatmap"},
+                "xaxis": {"title": {"text": "Region"}},
+                "yaxis": {"title": {"text": "Metric"}},
+            },
         )
 
-        return fig
-
+    @_cached_chart
     def create_profit_margin_chart(self):
+        if _is_empty(self.data_loader.product_sales):
+            return None
+
         regional_perf = self.metrics_calculator.get_regional_performance()
 
         if regional_perf.empty:
             return None
 
-        fig = px.bar(
-            regional_perf.reset_index(),
-            x="Region",
-            y="Margin_%",
-            title="Profit Margins by Region",
-            labels={"Margin_%": "Profit Margin (%)", "Region": "Region"},
-            color="Margin_%",
-            color_continuous_scale="Viridis",
+        margin = regional_perf["Margin_%"]
+
+        return _figure(
+            [
+                {
+                    "type": "bar",
+                    "x": regional_perf.index.astype(str),
+                    "y": margin,
+                    "marker": {
+                        "color": margin,
+                        "colorscale": "Viridis",
+                        "showscale": True,
+                        "colorbar": {"title": {"text": "Profit Margin (%)"}},
+                    },
+                }
+            ],
+            {
+                "title": {"text": "Profit Margins by Region"},
+                "xaxis": {"title": {"text": "Region"}},
+                "yaxis": {"title": {"text": "Profit Margin (%)"}},
+            },
         )
 
-        fig.update_layout(height=400)
-        return fig
-
+    @_cached_chart
     def create_inventory_status_chart(self):
         inventory = self.data_loader.inventory_data
 
-        if inventory is None or "QuantityInStock" not in inventory.columns:
+        if _is_empty(inventory) or "QuantityInStock" not in inventory.columns:
             return None
 
-        stock_ranges = pd.cut(
-            inventory["QuantityInStock"],
-            bins=[0, 50, 100, 200, float("inf")],
-            labels=[
-                "Critical (0-50)",
-                "Low (51-100)",
-                "Medium (101-200)",
-                "High (200+)",
-            ],
+        counts = _stock_counts(
+            inventory["QuantityInStock"].to_numpy(dtype=np.float64), STOCK_EDGES
         )
-
-        stock_distribution = stock_ranges.value_counts()
-
-        fig = px.pie(
-            values=stock_distribution.values,
-            names=stock_distribution.index,
-            title="Inventory Stock Level Distribution",
-            color_discrete_sequence=px.colors.sequential.RdBu,
+        # Largest bin first, as value_counts ordered it, so slice colors match
+        order = np.argsort(-counts, kind="stable")
+
+        return _figure(
+            [
+                {
+                    "type": "pie",
+                    "values": counts[order],
+                    "labels": STOCK_LABELS[order],
+                    "marker": {"colors": sequential.RdBu},
+                }
+            ],
+            {"title": {"text": "Inventory Stock Level Distribution"}},
         )
 
-        fig.update_layout(height=400)
-        return fig
-
+    @_cached_chart
     def create_customer_metrics_chart(self):
         customers = self.data_loader.customer_data
 
-        if customers is None:
+        if _is_empty(customers):
             return None
 
         # Look for purchase amount column
@@ -167,18 +306,30 @@ class DashboardVisualizations:
         if amount_col is None:
             return None
 
-        fig = px.histogram(
-            customers,
-            x=amount_col,
-            title="Customer Purchase Distribution",
-            labels={amount_col: "Purchase Amount ($)"},
-            nbins=50,
-            color_discrete_sequence=["#636EFA"],
+        # Bin server-side so the browser gets 50 bars instead of every row
+        amounts = customers[amount_col].to_numpy(dtype=np.float64)
+        amounts = amounts[~np.isnan(amounts)]
+        counts, edges = np.histogram(amounts, bins=50)
+
+        return _figure(
+            [
+                {
+                    "type": "bar",
+                    "x": 0.5 * (edges[1:] + edges[:-1]),
+                    "y": counts,
+                    "width": np.diff(edges),
+                    "marker": {"color": "#636EFA"},
+                }
+            ],
+            {
+                "title": {"text": "Customer Purchase Distribution"},
+                "xaxis": {"title": {"text": "Purchase Amount ($)"}},
+                "yaxis": {"title": {"text": "count"}},
+                "bargap": 0,
+            },
         )
 
-        fig.update_layout(height=400)
-        return fig
-
+    @_cached_chart
     def create_kpi_summary(self):
         all_metrics = self.metrics_calculator.get_all_key_metrics()
 
@@ -246,6 +397,6 @@ class DashboardVisualizations:
             col=2,
         )
 
-        fig.update_layout(height=500)
+        fig.update_layout(KPI_LAYOUT)
 
         return fig